@@ -141,6 +141,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files (images, icons, etc.)
 MEDIA_URL = '/media/'  # Ensure there's a trailing slash
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Recipe image variants are encoded on a background thread after the save
+# commits; turn off to encode them in the committing thread instead
+THUMBNAILS_IN_BACKGROUND = config('THUMBNAILS_IN_BACKGROUND', default=True, cast=bool)
 
 
 # Default primary key field type
@@ -158,3 +161,21 @@ LOGOUT_REDIRECT_URL = '/'
 # AI Meal Planner - Google Gemini API
 GOOGLE_API_KEY = config('GOOGLE_API_KEY', default='')
 
+
+# Chatbot retrieval index (see recipes.rag and regenerate_faiss.py)
+FAISS_INDEX_PATH = os.path.join(BASE_DIR, 'faiss_index.index')
+# 'google' (EMBEDDING_MODEL through the Gemini API) or 'local' (feature
+# hashing in NumPy: no network or API key, for offline builds and tests)
+EMBEDDING_BACKEND = config('EMBEDDING_BACKEND', default='google')
+EMBEDDING_MODEL = 'models/text-embedding-004'
+LOCAL_EMBEDDING_DIMENSIONS = config('LOCAL_EMBEDDING_DIMENSIONS', default=512, cast=int)
+# Document vectors keyed by model + text hash, reused across index rebuilds
+EMBEDDING_CACHE_PATH = config('EMBEDDING_CACHE_PATH', default=os.path.join(BASE_DIR, 'embedding_cache.sqlite3'))
+# Live index updates are applied by one writer process: `manage.py
+# update_faiss_index --watch`, or a single-process server with
+# FAISS_INDEX_WRITER on. Never turn it on for several workers at once.
+FAISS_INDEX_WRITER = config('FAISS_INDEX_WRITER', default=False, cast=bool)
+# Seconds to batch recipe changes before embedding them, and between
+# saves of a new index version
+FAISS_FLUSH_DELAY = config('FAISS_FLUSH_DELAY', default=2.0, cast=float)
+FAISS_PERSIST_INTERVAL = config('FAISS_PERSIST_INTERVAL', default=60.0, cast=float)
@@ -18,11 +18,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from recipes import views as recipe_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('FitBuddy_app.urls')),
     path('recipe/', include('recipes.urls')),
+    path('api/recipes/', recipe_views.recipes_api, name='recipes_api'),
     path('plans/', include('diet_plan.urls')),
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
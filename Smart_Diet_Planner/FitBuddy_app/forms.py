@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import UserProfile, MealLog
 from recipes.models import Recipe
+from recipes.widgets import RecipeAutocompleteWidget
 from datetime import date
 
 
@@ -52,10 +53,9 @@ class UserRegistrationForm(UserCreationForm):
 class MealLogForm(forms.ModelForm):
     recipe = forms.ModelChoiceField(
         queryset=Recipe.objects.all(),
-        widget=forms.Select(attrs={
-            'class': 'form-select',
+        widget=RecipeAutocompleteWidget(attrs={
             'id': 'recipe-select'
-        }),
+        }, nutrition_only=True),
         empty_label="Select a recipe..."
     )
     
@@ -107,7 +107,7 @@ class MealLogForm(forms.ModelForm):
         if user:
             self.fields['recipe'].queryset = Recipe.objects.filter(
                 calories__isnull=False
-            ).order_by('recipe_name')
+            )
 
 
 class QuickMealLogForm(forms.Form):
@@ -1,7 +1,6 @@
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login as auth_login
-from django.core.paginator import Paginator
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth.models import User
@@ -10,6 +9,8 @@ from django.conf import settings
 from django.db.models import Q
 from .models import UserProfile, MealLog, DailyNutritionSummary
 from recipes.models import Recipe
+from recipes.browse import get_browse_page
+from recipes.conditional import listing_etag
 from datetime import date
 import json
 from recipes.rag import process_query
@@ -17,6 +18,7 @@ from recipes.simple_meal_planner import generate_simple_meal_plan, get_simple_re
 from django.utils.http import url_has_allowed_host_and_scheme
 import re
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import condition
 
 def home(request):
     return render(request, 'FitBuddy_app/home.html')
@@ -158,43 +160,10 @@ def terms(request):
 def roadmap(request):
     return render(request, 'FitBuddy_app/roadmap.html')
 
+@condition(etag_func=listing_etag)
 def features(request):
     """View to display recipes filtered by diet type - redirected from old features URL"""
-    from django.db.models import Q
-    
-    diet_type = request.GET.get('diet', 'All')
-    search_query = request.GET.get('search', '')
-    
-    # Get all available diet types
-    diet_types = Recipe.get_available_diet_types()
-    
-    # Filter recipes
-    recipes = Recipe.objects.all()
-    
-    if diet_type != 'All':
-        recipes = recipes.filter(diet_types__icontains=diet_type)
-    
-    if search_query:
-        recipes = recipes.filter(
-            Q(recipe_name__icontains=search_query) |
-            Q(ingredients__icontains=search_query) |
-            Q(type__icontains=search_query)
-        )
-    
-    # Get recipe counts by diet type
-    diet_counts = {}
-    for dt in diet_types:
-        diet_counts[dt] = Recipe.objects.filter(diet_types__icontains=dt).count()
-    
-    context = {
-        'recipes': recipes.order_by('recipe_name'),
-        'diet_types': diet_types,
-        'selected_diet': diet_type,
-        'search_query': search_query,
-        'diet_counts': diet_counts,
-        'total_recipes': Recipe.objects.count()
-    }
-    
+    context = get_browse_page(request)
     return render(request, 'FitBuddy_app/featured_recipes.html', context)
 
 def recipe_query(request):
@@ -3,11 +3,10 @@
 Simple script to add real food images to recipes using free APIs
 Uses Foodish API and other free food image services
 """
+import argparse
 import os
 import django
 import sys
-import requests
-import time
 import random
 
 # Add the project directory to Python path
@@ -18,12 +17,18 @@ sys.path.append(project_dir)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FitBuddy.settings')
 django.setup()
 
+from recipes.fetching import Checkpoint, ImageFetcher, run_concurrently
 from recipes.models import Recipe
 from django.core.files.base import ContentFile
 from django.conf import settings
+from django.db.models import Q
 
 class FoodImageFetcher:
-    def __init__(self):
+    def __init__(self, concurrency=4, rate=1.0, checkpoint=None):
+        self.concurrency = max(1, concurrency)
+        self.fetcher = ImageFetcher(concurrency=self.concurrency, rate=rate)
+        self.checkpoint = Checkpoint(checkpoint)
+
         # Free food image APIs
         self.apis = [
             "https://foodish-api.herokuapp.com/api/",
@@ -75,99 +80,81 @@ class FoodImageFetcher:
     
     def fetch_foodish_image(self):
         """Fetch random food image from Foodish API"""
-        try:
-            response = requests.get("https://foodish-api.herokuapp.com/api/", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('image')
-        except:
-            pass
-        return None
-    
-    def download_image(self, url, recipe_name):
-        """Download image from URL"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            # Validate that it's an image
-            content_type = response.headers.get('content-type', '')
-            if 'image' not in content_type:
-                print(f"⚠️ Invalid content type for {recipe_name}: {content_type}")
-                return None
-            
-            # Create filename
-            filename = f"{recipe_name.lower().replace(' ', '_').replace('/', '_')[:50]}.jpg"
-            
-            return ContentFile(response.content, name=filename)
-            
-        except Exception as e:
-            print(f"❌ Error downloading image for {recipe_name}: {e}")
-            return None
-    
+        data = self.fetcher.get_json("https://foodish-api.herokuapp.com/api/")
+        return data.get('image') if data else None
+
+    def fetch_recipe_image(self, recipe):
+        """Image bytes for a recipe, trying the category, Foodish and general sources in turn"""
+        # Method 1: Try category-specific URL
+        category_url = self.get_food_category_from_recipe(
+            recipe.recipe_name,
+            recipe.type,
+            recipe.ingredients
+        )
+        content = self.fetcher.get_image(category_url)
+
+        # Method 2: Try Foodish API for random food image
+        if not content:
+            foodish_url = self.fetch_foodish_image()
+            if foodish_url:
+                content = self.fetcher.get_image(foodish_url)
+
+        # Method 3: Try general food search
+        if not content:
+            general_url = f"https://source.unsplash.com/400x300/?food,meal,{random.randint(1,1000)}"
+            content = self.fetcher.get_image(general_url)
+        return content
+
     def add_images_to_recipes(self):
         """Add images to all recipes that don't have them"""
-        recipes_without_images = Recipe.objects.filter(image__isnull=True)
-        total_recipes = recipes_without_images.count()
-        
+        done = self.checkpoint.load()
+        recipes_without_images = [
+            recipe for recipe in Recipe.objects.filter(Q(image__isnull=True) | Q(image='')).iterator()
+            if recipe.id not in done
+        ]
+        total_recipes = len(recipes_without_images)
+
         print(f"🔍 Found {total_recipes} recipes without images")
-        print("📸 Starting image download process...")
-        
+        print(f"📸 Starting image download process ({self.concurrency} parallel downloads)...")
+
         success_count = 0
-        
-        for i, recipe in enumerate(recipes_without_images, 1):
-            print(f"\n📥 Processing {i}/{total_recipes}: {recipe.recipe_name}")
-            
-            # Try different image sources
-            image_file = None
-            
-            # Method 1: Try category-specific URL
-            category_url = self.get_food_category_from_recipe(
-                recipe.recipe_name, 
-                recipe.type, 
-                recipe.ingredients
-            )
-            print(f"   🎯 Trying category-specific image...")
-            image_file = self.download_image(category_url, recipe.recipe_name)
-            
-            # Method 2: Try Foodish API for random food image
-            if not image_file:
-                print(f"   🎲 Trying random food image...")
-                foodish_url = self.fetch_foodish_image()
-                if foodish_url:
-                    image_file = self.download_image(foodish_url, recipe.recipe_name)
-            
-            # Method 3: Try general food search
-            if not image_file:
-                print(f"   🔍 Trying general food search...")
-                general_url = f"https://source.unsplash.com/400x300/?food,meal,{random.randint(1,1000)}"
-                image_file = self.download_image(general_url, recipe.recipe_name)
-            
+
+        results = run_concurrently(self.fetch_recipe_image, recipes_without_images, self.concurrency)
+        for i, (recipe, content) in enumerate(results, 1):
+            print(f"\n📥 Processed {i}/{total_recipes}: {recipe.recipe_name}")
+
             # Save the image if we got one
-            if image_file:
+            if content:
                 try:
                     recipe.image.save(
-                        f"{recipe.recipe_name.lower().replace(' ', '_')[:50]}.jpg",
-                        image_file,
+                        f"{recipe.recipe_name.lower().replace(' ', '_').replace('/', '_')[:50]}.jpg",
+                        ContentFile(content),
                         save=True
                     )
+                    self.checkpoint.mark(recipe.id)
                     print(f"   ✅ Successfully added image to {recipe.recipe_name}")
                     success_count += 1
                 except Exception as e:
                     print(f"   ❌ Error saving image for {recipe.recipe_name}: {e}")
             else:
                 print(f"   ⚠️ Failed to get image for {recipe.recipe_name}")
-            
-            # Small delay to be respectful to APIs
-            time.sleep(2)
-        
+
+        if success_count == total_recipes:
+            self.checkpoint.clear()
         print(f"\n🎉 Process completed!")
         print(f"✅ Successfully added images to {success_count}/{total_recipes} recipes")
 
 def main():
+    parser = argparse.ArgumentParser(description='Download food images for recipes without one')
+    parser.add_argument('--concurrency', type=int, default=4, help='parallel downloads')
+    parser.add_argument('--rate', type=float, default=1.0, help='requests per second per image host')
+    parser.add_argument(
+        '--checkpoint',
+        default=os.path.join(project_dir, '.download_food_images.checkpoint'),
+        help='file recording finished recipes so an interrupted run can resume',
+    )
+    args = parser.parse_args()
+
     print("🚀 Starting Food Image Download Process...")
     print("📊 This will add real food images to all your recipes!")
     
@@ -202,7 +189,7 @@ def main():
         return
     
     # Initialize fetcher and start process
-    fetcher = FoodImageFetcher()
+    fetcher = FoodImageFetcher(args.concurrency, args.rate, args.checkpoint)
     fetcher.add_images_to_recipes()
     
     print("\n✨ All done! Check your recipe detail pages to see the new images!")
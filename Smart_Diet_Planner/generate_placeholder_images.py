@@ -6,6 +6,9 @@ This creates custom images with recipe names and cuisine types
 import os
 import django
 import sys
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import random
 from io import BytesIO
@@ -21,6 +24,11 @@ django.setup()
 from recipes.models import Recipe
 from django.core.files.base import ContentFile
 from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+# Darkening applied on top of the gradient so white text stays readable
+OVERLAY_ALPHA = 50
 
 class PlaceholderImageGenerator:
     def __init__(self):
@@ -37,27 +45,35 @@ class PlaceholderImageGenerator:
         ]
         
         self.food_emojis = ['🍽️', '🥘', '🍳', '🥗', '🍲', '🥙', '🍕', '🥞', '🍜', '🥖']
+        self.title_font, self.subtitle_font, self.emoji_font = self.load_fonts()
     
-    def create_gradient_background(self, width, height, color1, color2):
-        """Create a gradient background"""
+    def load_fonts(self):
+        """Load the fonts once per generator instead of once per image"""
+        try:
+            title_font = ImageFont.truetype("arial.ttf", 24)
+            subtitle_font = ImageFont.truetype("arial.ttf", 16)
+        except OSError:
+            title_font = ImageFont.load_default()
+            subtitle_font = ImageFont.load_default()
+        try:
+            emoji_font = ImageFont.truetype("seguiemj.ttf", 48)  # Windows emoji font
+        except OSError:
+            emoji_font = ImageFont.load_default()
+        return title_font, subtitle_font, emoji_font
+    
+    def create_gradient_background(self, width, height, color1, color2, overlay_alpha=0):
+        """Create a vertical gradient background, optionally darkened by a black overlay"""
         # Convert hex to RGB
-        color1_rgb = tuple(int(color1[i:i+2], 16) for i in (1, 3, 5))
-        color2_rgb = tuple(int(color2[i:i+2], 16) for i in (1, 3, 5))
-        
-        # Create gradient
-        gradient = Image.new('RGB', (width, height))
-        draw = ImageDraw.Draw(gradient)
-        
-        for y in range(height):
-            # Calculate color for this row
-            ratio = y / height
-            r = int(color1_rgb[0] * (1 - ratio) + color2_rgb[0] * ratio)
-            g = int(color1_rgb[1] * (1 - ratio) + color2_rgb[1] * ratio)
-            b = int(color1_rgb[2] * (1 - ratio) + color2_rgb[2] * ratio)
-            
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
+        color1_rgb = np.array([int(color1[i:i+2], 16) for i in (1, 3, 5)], dtype=np.float32)
+        color2_rgb = np.array([int(color2[i:i+2], 16) for i in (1, 3, 5)], dtype=np.float32)
         
-        return gradient
+        # Interpolate every row at once, then repeat the row colours across the width
+        ratio = (np.arange(height, dtype=np.float32) / height)[:, None]
+        rows = np.floor(color1_rgb * (1 - ratio) + color2_rgb * ratio)
+        if overlay_alpha:
+            rows = np.round(rows * (1 - overlay_alpha / 255))
+        pixels = np.broadcast_to(rows.astype(np.uint8)[:, None, :], (height, width, 3))
+        return Image.fromarray(np.ascontiguousarray(pixels), 'RGB')
     
     def create_recipe_image(self, recipe_name, cuisine=None):
         """Create a beautiful placeholder image for a recipe"""
@@ -66,33 +82,13 @@ class PlaceholderImageGenerator:
         # Choose random color scheme
         color1, color2 = random.choice(self.colors)
         
-        # Create gradient background
-        img = self.create_gradient_background(width, height, color1, color2)
+        # Create gradient background with the semi-transparent overlay folded in
+        img = self.create_gradient_background(width, height, color1, color2, OVERLAY_ALPHA)
         draw = ImageDraw.Draw(img)
-        
-        # Add semi-transparent overlay
-        overlay = Image.new('RGBA', (width, height), (0, 0, 0, 50))
-        img = Image.alpha_composite(img.convert('RGBA'), overlay).convert('RGB')
-        draw = ImageDraw.Draw(img)
-        
-        # Try to load a font (fallback to default if not available)
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 24)
-            subtitle_font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            try:
-                title_font = ImageFont.load_default()
-                subtitle_font = ImageFont.load_default()
-            except:
-                title_font = ImageFont.load_default()
-                subtitle_font = ImageFont.load_default()
+        title_font, subtitle_font, emoji_font = self.title_font, self.subtitle_font, self.emoji_font
         
         # Add food emoji
         emoji = random.choice(self.food_emojis)
-        try:
-            emoji_font = ImageFont.truetype("seguiemj.ttf", 48)  # Windows emoji font
-        except:
-            emoji_font = ImageFont.load_default()
         
         # Calculate text positions
         emoji_bbox = draw.textbbox((0, 0), emoji, font=emoji_font)
@@ -151,35 +147,95 @@ class PlaceholderImageGenerator:
         
         return img
     
-    def add_images_to_recipes(self):
-        """Add placeholder images to all recipes that don't have them"""
-        recipes_without_images = Recipe.objects.filter(image__isnull=True)
+    def render_jpeg(self, recipe_name, cuisine=None):
+        """Encoded JPEG bytes of the placeholder for one recipe"""
+        img_buffer = BytesIO()
+        self.create_recipe_image(recipe_name, cuisine).save(img_buffer, format='JPEG', quality=90)
+        return img_buffer.getvalue()
+    
+    def add_images_to_recipes(self, workers=None, batch_size=500):
+        """Add placeholder images to all recipes that don't have them.
+        
+        Images are rendered in a process pool. At most a few tasks per worker
+        are in flight, so memory stays flat however many recipes there are,
+        and recipe rows are written with one bulk_update per batch.
+        """
+        workers = workers or os.cpu_count() or 1
+        recipes_without_images = Recipe.objects.filter(Q(image__isnull=True) | Q(image='')).order_by('id')
         total_recipes = recipes_without_images.count()
         
-        print(f"🔍 Found {total_recipes} recipes without images")
+        print(f"🔍 Found {total_recipes} recipes without images ({workers} workers)")
+        if not total_recipes:
+            return 0
         
-        for i, recipe in enumerate(recipes_without_images, 1):
-            print(f"🎨 Creating image {i}/{total_recipes}: {recipe.recipe_name}")
-            
-            # Create placeholder image
-            img = self.create_recipe_image(recipe.recipe_name, recipe.cuisine)
-            
-            # Save to BytesIO
-            img_buffer = BytesIO()
-            img.save(img_buffer, format='JPEG', quality=90)
-            img_buffer.seek(0)
-            
-            # Create Django file
-            filename = f"{recipe.recipe_name.lower().replace(' ', '_')}.jpg"
-            django_file = ContentFile(img_buffer.read(), name=filename)
-            
-            # Save to recipe
-            recipe.image.save(filename, django_file, save=True)
-            print(f"✅ Added custom image to {recipe.recipe_name}")
+        tasks = recipes_without_images.values_list('id', 'recipe_name', 'cuisine').iterator(chunk_size=batch_size)
+        image_field = Recipe._meta.get_field('image')
+        max_pending = workers * 4
+        pending = set()
+        batch = []
+        done = 0
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            for task in tasks:
+                pending.add(pool.submit(_render_recipe_image, task))
+                if len(pending) >= max_pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    done += self._collect(finished, batch, image_field)
+                    if len(batch) >= batch_size:
+                        self._save_batch(batch)
+                        print(f"🎨 {done}/{total_recipes} images created")
+            finished, _ = wait(pending)
+            done += self._collect(finished, batch, image_field)
+        self._save_batch(batch)
         
-        print(f"🎉 Created {total_recipes} beautiful recipe images!")
+        print(f"🎉 Created {done} beautiful recipe images!")
+        print("💡 Run `python manage.py generate_thumbnails` to build thumbnails for them.")
+        return done
+    
+    def _collect(self, futures, batch, image_field):
+        """Store finished images and queue their recipes for the next bulk update"""
+        for future in futures:
+            recipe_id, recipe_name, image_bytes = future.result()
+            filename = f"{recipe_name.lower().replace(' ', '_')}.jpg"
+            name = image_field.storage.save(
+                image_field.generate_filename(None, filename),
+                ContentFile(image_bytes),
+            )
+            batch.append(Recipe(id=recipe_id, image=name))
+        return len(futures)
+    
+    def _save_batch(self, batch):
+        """bulk_update skips Recipe.save and its signals, so redo what they would do"""
+        if not batch:
+            return
+        now = timezone.now()
+        for recipe in batch:
+            recipe.updated_at = now
+        # The new updated_at also retires the cached recipe cards
+        Recipe.objects.bulk_update(batch, ['image', 'updated_at'])
+        batch.clear()
+
+
+_worker_generator = None
+
+
+def _init_worker():
+    """Build one generator (and load its fonts) per worker process"""
+    global _worker_generator
+    _worker_generator = PlaceholderImageGenerator()
+
+
+def _render_recipe_image(task):
+    recipe_id, recipe_name, cuisine = task
+    return recipe_id, recipe_name, _worker_generator.render_jpeg(recipe_name, cuisine)
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate placeholder images for recipes without one")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=500, help='Recipes written per bulk update')
+    args = parser.parse_args()
+    
     print("🚀 Starting Custom Recipe Image Generation...")
     
     # Check if media directory exists
@@ -194,9 +250,9 @@ def main():
     image_generator = PlaceholderImageGenerator()
     
     # Add images to recipes
-    image_generator.add_images_to_recipes()
+    image_generator.add_images_to_recipes(workers=args.workers, batch_size=args.batch_size)
     
     print("✨ All done! Your recipes now have beautiful custom images!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Recipe
+from .models import Recipe, Ingredient
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
@@ -29,3 +29,9 @@ class RecipeAdmin(admin.ModelAdmin):
             'fields': ('ingredients', 'instructions')
         }),
     )
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
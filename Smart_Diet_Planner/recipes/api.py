@@ -0,0 +1,75 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Recipe
+from .nutrition import parse_ranges, sort_ordering
+
+# Columns clients may ask for with ?fields=
+API_FIELDS = (
+    'id', 'recipe_name', 'type', 'cuisine', 'diet_types',
+    'calories', 'fat', 'saturated_fat', 'cholesterol', 'sodium',
+    'carbohydrate', 'fiber', 'sugar', 'protein', 'protein_per_calorie',
+    'cook_time', 'prep_time', 'total_time',
+    'ingredients_list', 'instructions_list', 'image', 'updated_at',
+)
+DEFAULT_API_FIELDS = ('id', 'recipe_name', 'type', 'cuisine', 'diet_types', 'calories', 'protein', 'carbohydrate', 'fat')
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class APIQueryError(ValueError):
+    """A query parameter the recipe API cannot honour"""
+
+
+def parse_fields(value):
+    """Validate a comma-separated ?fields= value; id is always returned"""
+    if not value:
+        return DEFAULT_API_FIELDS
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise APIQueryError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(['id', *fields]))
+
+
+def filter_recipes(params, queryset=None):
+    """Apply the ?diet= and nutrition range (?min_protein=, ?max_calories=, ...) filters"""
+    recipes = Recipe.objects.all() if queryset is None else queryset
+    diet = params.get('diet')
+    if diet and diet != 'All':
+        recipes = recipes.with_diet(diet)
+
+    try:
+        ranges = parse_ranges(params)
+    except ValueError as e:
+        raise APIQueryError(str(e))
+    return recipes.filter(**ranges)
+
+
+def api_ordering(sort):
+    """Keyset ordering for ?sort=, by id when no sort is given"""
+    if not sort:
+        return ('id',)
+    ordering = sort_ordering(sort)
+    if ordering is None:
+        raise APIQueryError(f"Unknown sort: {sort}")
+    return ordering
+
+
+def _image_url(name):
+    return Recipe._meta.get_field('image').storage.url(name) if name else None
+
+
+def clean_row(row):
+    """Turn a .values() row into its API form (image paths become URLs)"""
+    if 'image' in row:
+        row['image'] = _image_url(row['image'])
+    return row
+
+
+def export_lines(queryset, fields):
+    """Newline-delimited JSON for a whole queryset, read from the database in chunks"""
+    rows = queryset.order_by('id').values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for row in rows:
+        yield json.dumps(clean_row(row), cls=DjangoJSONEncoder) + '\n'
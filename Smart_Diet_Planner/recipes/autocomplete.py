@@ -0,0 +1,90 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+from .catalog import CatalogIndex
+from .models import Ingredient, Recipe
+
+SUGGESTION_FIELDS = ('id', 'recipe_name', 'calories', 'protein', 'carbohydrate', 'fat')
+
+
+def _key(text):
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', (text or '').lower())).strip()
+
+
+@dataclass
+class PrefixIndex:
+    """Sorted (key, value) pairs answering prefix queries with a binary search"""
+    keys: list = field(default_factory=list)
+    values: list = field(default_factory=list)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        pairs = sorted(pairs)
+        return cls(keys=[key for key, _ in pairs], values=[value for _, value in pairs])
+
+    def scan(self, prefix):
+        """Values whose key starts with ``prefix``, in key order"""
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            yield self.values[i]
+            i += 1
+
+
+@dataclass
+class AutocompleteIndex:
+    names: PrefixIndex
+    words: PrefixIndex
+    ingredients: PrefixIndex
+    recipes: dict
+
+    def suggest(self, query, limit=10, nutrition_only=False):
+        """Recipes whose name (or a later word of it) starts with ``query``, plus matching ingredients"""
+        prefix = _key(query)
+        if not prefix:
+            return {'recipes': [], 'ingredients': []}
+
+        recipes, seen = [], set()
+        # Whole-name prefix matches first, then matches on a later word
+        for source in (self.names.scan(prefix), self.words.scan(prefix)):
+            for recipe_id in source:
+                if len(recipes) >= limit:
+                    break
+                recipe = self.recipes[recipe_id]
+                if recipe_id in seen or (nutrition_only and recipe['calories'] is None):
+                    continue
+                seen.add(recipe_id)
+                recipes.append(recipe)
+
+        ingredients = []
+        for name in self.ingredients.scan(prefix):
+            if len(ingredients) >= min(limit, 5):
+                break
+            ingredients.append(name)
+        return {'recipes': recipes, 'ingredients': ingredients}
+
+
+def build_autocomplete_index(version):
+    recipes, names, words = {}, [], []
+    for row in Recipe.objects.values(*SUGGESTION_FIELDS).iterator():
+        recipes[row['id']] = row
+        key = _key(row['recipe_name'])
+        names.append((key, row['id']))
+        parts = key.split(' ')
+        for i in range(1, len(parts)):
+            words.append((' '.join(parts[i:]), row['id']))
+    ingredients = [(name, name) for name in Ingredient.objects.values_list('name', flat=True).iterator()]
+    return AutocompleteIndex(
+        names=PrefixIndex.from_pairs(names),
+        words=PrefixIndex.from_pairs(words),
+        ingredients=PrefixIndex.from_pairs(ingredients),
+        recipes=recipes,
+    )
+
+
+autocomplete_index = CatalogIndex(build_autocomplete_index)
+
+
+def suggest(query, limit=10, nutrition_only=False):
+    """Typeahead suggestions from the in-memory prefix index"""
+    return autocomplete_index.get().suggest(query, limit, nutrition_only)
@@ -0,0 +1,77 @@
+from django.utils.http import urlencode
+
+from .diets import canonical_diet
+from .facets import get_diet_facets
+from .models import Recipe
+from .nutrition import NUTRIENTS, SORT_OPTIONS, apply_sort, parse_ranges, sort_ordering
+from .pagination import keyset_page
+from .search import search_available, search_recipes
+
+RECIPES_PER_PAGE = 24
+
+
+def get_browse_queryset(diet_type, search_query, ranges=None, sort=None):
+    """Recipes for the browse pages plus the keyset ordering to page them with"""
+    recipes = Recipe.objects.all()
+
+    if diet_type != 'All':
+        recipes = recipes.with_diet(diet_type)
+
+    if ranges:
+        recipes = recipes.filter(**ranges)
+
+    ordering = sort_ordering(sort)
+    if search_query:
+        # Full-text search, best matches first unless another sort was picked
+        recipes = search_recipes(recipes, search_query)
+        if ordering is None and search_available():
+            return recipes, ('search_rank', 'id')
+    if ordering is not None:
+        return apply_sort(recipes, ordering), ordering
+    return recipes, ('recipe_name', 'id')
+
+
+def get_browse_page(request):
+    """Filter, count and keyset-paginate recipes from the browse query string"""
+    diet_type = request.GET.get('diet', 'All')
+    search_query = request.GET.get('search', '')
+    ranges = parse_ranges(request.GET, ignore_invalid=True)
+    sort = request.GET.get('sort', '')
+    if sort not in SORT_OPTIONS:
+        sort = ''
+    nutrition_filters = {
+        f'{prefix}_{nutrient}': request.GET.get(f'{prefix}_{nutrient}', '')
+        for nutrient in NUTRIENTS for prefix in ('min', 'max')
+    }
+
+    recipes, ordering = get_browse_queryset(diet_type, search_query, ranges, sort)
+    page = keyset_page(recipes, ordering, request.GET.get('cursor'), RECIPES_PER_PAGE)
+
+    # Get recipe counts by diet type (single cached query)
+    diet_counts, total_recipes = get_diet_facets()
+
+    if search_query or ranges or sort not in ('', 'name'):
+        result_count = recipes.count()
+    elif diet_type != 'All':
+        result_count = diet_counts.get(canonical_diet(diet_type), 0)
+    else:
+        result_count = total_recipes
+
+    return {
+        'recipes': page.items,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+        'result_count': result_count,
+        'diet_types': Recipe.get_available_diet_types(),
+        'selected_diet': diet_type,
+        'search_query': search_query,
+        'diet_counts': diet_counts,
+        'total_recipes': total_recipes,
+        'nutrition_filters': nutrition_filters,
+        'sort': sort,
+        'sort_options': [(key, label) for key, (label, _) in SORT_OPTIONS.items()],
+        # Nutrition filters and sort, carried over by the diet links and load-more
+        'filter_query': urlencode(
+            {key: value for key, value in {**nutrition_filters, 'sort': sort}.items() if value}
+        ),
+    }
@@ -0,0 +1,43 @@
+import threading
+
+from django.db import connection
+
+from .models import Recipe
+
+
+def get_catalog_version():
+    """Version of the recipe catalog, read from the database.
+
+    The latest updated_at moves with every save and bulk write (they all set
+    it) and the row count with every delete, so every process, including
+    the management commands, agrees on the version without a shared cache.
+    Both are answered from the updated_at index in one round trip.
+    """
+    table = connection.ops.quote_name(Recipe._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT (SELECT MAX(updated_at) FROM {table}), (SELECT COUNT(*) FROM {table})')
+        latest, count = cursor.fetchone()
+    return f'{latest or ""}:{count}'
+
+
+class CatalogIndex:
+    """Process-wide value built from the catalog and rebuilt when its version moves.
+
+    ``build`` is called with the catalog version; requests only pay the
+    version query until a recipe changes.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._value = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_catalog_version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._value = self.build(version)
+                    self._version = version
+        return self._value
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from operator import or_
+
+import numpy as np
+
+# Keyword lists read by the categorization rules, matched as substrings of
+# the lowercased recipe name
+RULE_KEYWORDS = {
+    'keto': ["keto", "ketogenic", "fat bomb"],
+    'paleo_avoid': ["bread", "pasta", "rice", "oats", "quinoa", "beans", "lentils",
+                    "cheese", "milk", "yogurt", "peanut", "soy"],
+    'vegan': ["vegan", "plant-based", "tofu", "quinoa", "lentil", "chickpea"],
+    'animal': ["meat", "chicken", "beef", "pork", "fish", "salmon", "tuna",
+               "egg", "cheese", "milk", "cream", "butter", "bacon", "ham"],
+    'plant_protein': ["beans", "lentils", "chickpea", "tofu", "quinoa", "nuts"],
+    'meat': ["meat", "chicken", "beef", "pork", "fish", "salmon", "tuna",
+             "bacon", "ham", "turkey", "lamb"],
+    'mediterranean': ["mediterranean", "olive", "fish", "salmon", "tuna", "tomato", "herbs"],
+    'low_carb': ["low carb", "low-carb", "no carb"],
+    'protein': ["protein", "lean", "muscle"],
+    'gluten': ["bread", "pasta", "wheat", "flour", "barley", "rye", "oats"],
+    'gluten_free': ["gluten-free", "gluten free", "rice", "quinoa"],
+}
+RULE_GROUPS = list(RULE_KEYWORDS)
+_GROUP = {group: i for i, group in enumerate(RULE_GROUPS)}
+
+# Output columns of classify(), in the order the label strings are built from
+LABELS = ["Ketogenic", "Paleo", "Vegan", "Vegetarian", "Mediterranean",
+          "Low Carb", "High Protein", "Gluten Free", "Balanced"]
+
+# Bump when the rules in classify() change, so every recipe is reprocessed
+RULES_VERSION = 1
+_RULES_KEY = json.dumps([RULES_VERSION, RULE_KEYWORDS, LABELS]).encode()
+
+
+class KeywordMatcher:
+    """All RULE_KEYWORDS compiled into one regex, answering "which groups occur in this text"
+
+    The pattern is a lookahead tried at every position, longest keyword
+    first, so overlapping keywords are all seen: a keyword found at a
+    position also implies every shorter keyword that is a prefix of it
+    ("lentils" implies "lentil").
+    """
+
+    def __init__(self, keywords=RULE_KEYWORDS):
+        bits = {}
+        for i, words in enumerate(keywords.values()):
+            for word in words:
+                bits[word] = bits.get(word, 0) | 1 << i
+        self.bits = {
+            word: reduce(or_, (mask for other, mask in bits.items() if word.startswith(other)))
+            for word in bits
+        }
+        alternatives = '|'.join(re.escape(word) for word in sorted(bits, key=len, reverse=True))
+        self.pattern = re.compile(f'(?=({alternatives}))')
+
+    def flags(self, text):
+        """Bitmask of the keyword groups found in ``text``, by position in ``keywords``"""
+        mask = 0
+        for match in self.pattern.finditer(text):
+            mask |= self.bits[match.group(1)]
+        return mask
+
+
+matcher = KeywordMatcher()
+
+
+def classify(rows):
+    """Diet type strings for (recipe_name, type, protein, carbohydrate, fat) rows.
+
+    The macro rules run over NumPy columns; only the keyword scan is per row.
+    """
+    if not rows:
+        return []
+    names, types, protein, carbs, fat = zip(*rows)
+    flags = np.array([matcher.flags((name or '').lower()) for name in names], dtype=np.int64)
+    types = np.array([(recipe_type or '').lower() for recipe_type in types])
+    protein, carbs, fat = (np.array([value or 0 for value in column], dtype=np.float64) for column in (protein, carbs, fat))
+
+    def has(group):
+        return (flags >> _GROUP[group]) & 1 == 1
+
+    # Percent of macro calories, 0 when a recipe has no macros at all
+    total = protein * 4 + carbs * 4 + fat * 9
+    with np.errstate(divide='ignore', invalid='ignore'):
+        protein_pct = np.where(total > 0, (protein * 4) / total * 100, 0)
+        carb_pct = np.where(total > 0, (carbs * 4) / total * 100, 0)
+        fat_pct = np.where(total > 0, (fat * 9) / total * 100, 0)
+
+    keto = (fat_pct > 65) & (carb_pct < 15) | has('keto') | (types == 'keto')
+    paleo = ~has('paleo_avoid')
+    vegan = has('vegan') | (types == 'vegan') | ~has('animal') & has('plant_protein')
+    vegetarian = vegan | ~has('meat')
+    mediterranean = has('mediterranean') | (types == 'mediterranean')
+    low_carb = (carb_pct < 30) & (carbs < 20) | has('low_carb')
+    high_protein = (protein_pct > 25) | (protein > 20) | has('protein')
+    gluten_free = ~has('gluten') | has('gluten_free')
+
+    matched = np.column_stack([keto, paleo, vegan, vegetarian, mediterranean, low_carb, high_protein, gluten_free])
+    # Balanced when nothing else matched, or when the only label is
+    # Vegetarian or Gluten Free (a vegan recipe is also vegetarian, so never alone)
+    counted = matched.sum(axis=1)
+    balanced = (counted == 0) | (counted == 1) & (vegetarian | gluten_free)
+
+    codes = np.column_stack([matched, balanced]) @ (1 << np.arange(len(LABELS)))
+    return [_label(int(code)) for code in codes]
+
+
+def content_hash(recipe_name, recipe_type, protein, carbohydrate, fat):
+    """Fingerprint of everything classify() reads for a recipe, stored as Recipe.category_hash"""
+    digest = hashlib.blake2b(_RULES_KEY, digest_size=8)
+    digest.update(repr((recipe_name, recipe_type, protein, carbohydrate, fat)).encode())
+    return digest.hexdigest()
+
+
+_labels = {}
+
+
+def _label(code):
+    if code not in _labels:
+        _labels[code] = ", ".join(sorted(label for i, label in enumerate(LABELS) if code >> i & 1))
+    return _labels[code]
+
+
+def classify_sharded(rows, workers=1, shard_size=20000):
+    """classify() split across ``workers`` processes for very large catalogs"""
+    if workers <= 1 or len(rows) <= shard_size:
+        return classify(rows)
+    shards = [rows[i:i + shard_size] for i in range(0, len(rows), shard_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [labels for shard in pool.map(classify, shards) for labels in shard]
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .catalog import get_catalog_version
+
+from .models import Recipe, SimilarRecipe
+
+
+def _viewer_key(request):
+    """Per-visitor part of a validator.
+
+    The pages show the logged-in user and embed a CSRF token, so a cached copy
+    is only reusable by the same user holding the same CSRF cookie.
+    """
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else ''
+    return f'{user_id}:{request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")}'
+
+
+def make_etag(*parts):
+    """Strong ETag value for a page built from ``parts``"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def recipe_etag(request, pk):
+    """ETag for the recipe detail page, None if the recipe does not exist.
+
+    Besides the recipe row it covers the similar-recipe block: the build that
+    wrote it, and the neighbours' own updates and deletes. The page has no
+    Last-Modified, since a rebuild changes it without touching the recipe.
+    """
+    updated_at = Recipe.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    similar = SimilarRecipe.objects.filter(recipe_id=pk).aggregate(
+        built=Max('built_at'), latest=Max('similar__updated_at'), count=Count('id')
+    )
+    return make_etag(
+        'recipe', pk, updated_at.isoformat(), similar['built'], similar['latest'], similar['count'],
+        _viewer_key(request),
+    )
+
+
+def listing_etag(request):
+    """ETag for a recipe listing: the catalog version plus the filter parameters"""
+    params = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+    return make_etag('listing', request.path, get_catalog_version(), params, _viewer_key(request))
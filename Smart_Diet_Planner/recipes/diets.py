@@ -0,0 +1,73 @@
+import re
+
+# Canonical diet types. The position in this list is the bit used in
+# Recipe.diet_mask, so only ever append new entries at the end.
+DIET_TYPES = [
+    'Balanced',
+    'Ketogenic (Keto)',
+    'Paleo',
+    'Vegetarian',
+    'Vegan',
+    'Mediterranean',
+    'Low Carb',
+    'High Protein',
+    'Gluten Free',
+]
+
+# Spellings used across the project that should resolve to a canonical type
+DIET_ALIASES = {
+    'keto': 'Ketogenic (Keto)',
+    'plant based': 'Vegan',
+}
+
+
+def _diet_key(name):
+    """Normalize a diet name for comparison ("Ketogenic (Keto)" -> "ketogenic")"""
+    key = re.sub(r'\(.*?\)', ' ', name or '').lower()
+    key = re.sub(r'[-_\s]+', ' ', key)
+    return key.strip()
+
+
+_DIET_BITS = {_diet_key(diet): 1 << i for i, diet in enumerate(DIET_TYPES)}
+for _alias, _diet in DIET_ALIASES.items():
+    _DIET_BITS[_diet_key(_alias)] = _DIET_BITS[_diet_key(_diet)]
+
+ALL_DIETS_MASK = (1 << len(DIET_TYPES)) - 1
+
+
+def canonical_diet(name):
+    """Return the canonical diet type for a name or alias, or None if unknown"""
+    bit = diet_bit(name)
+    if not bit:
+        return None
+    return DIET_TYPES[bit.bit_length() - 1]
+
+
+def diet_bit(name):
+    """Return the bit for a diet type name (0 if the name is unknown)"""
+    return _DIET_BITS.get(_diet_key(name), 0)
+
+
+def diet_mask_for(names):
+    """Build a bitmask from an iterable of diet type names"""
+    mask = 0
+    for name in names:
+        mask |= diet_bit(name)
+    return mask
+
+
+def parse_diet_types(value):
+    """Split a comma-separated diet_types string into a list of names"""
+    if not value:
+        return []
+    return [diet.strip() for diet in value.split(',') if diet.strip()]
+
+
+def masks_with_bit(bit):
+    """All mask values that contain ``bit``.
+
+    Filtering with ``diet_mask__in=masks_with_bit(bit)`` lets the database
+    answer membership with index probes on diet_mask instead of evaluating a
+    bitwise expression (or a LIKE) against every row.
+    """
+    return [mask for mask in range(ALL_DIETS_MASK + 1) if mask & bit]
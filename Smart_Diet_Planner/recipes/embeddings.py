@@ -0,0 +1,191 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from langchain_core.embeddings import Embeddings
+
+# SQLite's default limit on bound parameters per statement
+_MAX_PARAMS = 900
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def recipe_document(recipe):
+    """The text indexed for the chatbot, from a get_recipes_data() row"""
+    text = f"Recipe: {recipe['recipe_name']}\n"
+    text += f"Cuisine: {recipe['cuisine']}\n"
+    text += f"Type: {recipe['type']}\n"
+    text += f"Ingredients: {recipe['ingredients']}\n"
+    text += f"Instructions: {recipe['instructions']}\n"
+    text += f"Nutritional Information:\n"
+    text += f"- Calories: {recipe['calories']}\n"
+    text += f"- Fat: {recipe['fat']}g\n"
+    text += f"- Saturated Fat: {recipe['saturated_fat']}g\n"
+    text += f"- Cholesterol: {recipe['cholesterol']}mg\n"
+    text += f"- Sodium: {recipe['sodium']}mg\n"
+    text += f"- Carbohydrate: {recipe['carbohydrate']}g\n"
+    text += f"- Fiber: {recipe['fiber']}g\n"
+    text += f"- Sugar: {recipe['sugar']}g\n"
+    text += f"- Protein: {recipe['protein']}g\n"
+    return text
+
+
+def document_key(text, model):
+    """Cache key of a document: the same text embedded by another model is a different entry"""
+    return hashlib.sha256(f'{model}\0{text}'.encode()).digest()
+
+
+class EmbeddingCache:
+    """Document vectors in one SQLite file, stored as float32 bytes under document_key()"""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID'
+        )
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        """{key: vector} for the keys that are cached"""
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), _MAX_PARAMS):
+                chunk = keys[start:start + _MAX_PARAMS]
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def set_many(self, items):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)',
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+            )
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedder so documents it has seen before are not sent to it again.
+
+    Queries are always embedded live; they are short and rarely repeat.
+    """
+
+    def __init__(self, embeddings, model, cache, batch_size=100):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.hits = self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [document_key(text, self.model) for text in texts]
+        vectors = self.cache.get_many(set(keys))
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            embedded = self.embeddings.embed_documents([text for _, text in batch])
+            items = [(key, vector) for (key, _), vector in zip(batch, embedded)]
+            self.cache.set_many(items)
+            vectors.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in items)
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+@lru_cache(maxsize=2 ** 18)
+def _word_hash(word):
+    # crc32 is the same in every process, unlike hash()
+    return zlib.crc32(word.encode())
+
+
+class HashingEmbeddings(Embeddings):
+    """Offline embedder: signed feature hashing of words and word pairs, L2-normalized.
+
+    Nothing is fitted, so a rebuild, a live update and a query all land in
+    the same space, and no network or API key is needed.
+    """
+
+    def __init__(self, dimensions=512, batch_size=1000):
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    def encode(self, texts):
+        """float32 matrix with one unit-length row per text"""
+        hashes, counts = [], []
+        for text in texts:
+            words = _WORD.findall(text.lower())
+            hashes.extend(map(_word_hash, words))
+            counts.append(len(words))
+        hashes = np.array(hashes, dtype=np.uint64)
+        rows = np.repeat(np.arange(len(texts)), counts)
+        # Pairs of neighbouring words in the same text, hashed from the word hashes
+        same_text = rows[1:] == rows[:-1]
+        pairs = (hashes[:-1] * np.uint64(0x9E3779B1) ^ hashes[1:]) & np.uint64(0xFFFFFFFF)
+        hashes = np.concatenate([hashes, pairs[same_text]])
+        rows = np.concatenate([rows, rows[1:][same_text]])
+
+        cells = rows * self.dimensions + (hashes % np.uint64(self.dimensions)).astype(np.int64)
+        signs = np.where(hashes & np.uint64(0x80000000), -1.0, 1.0)
+        matrix = np.bincount(cells, weights=signs, minlength=len(texts) * self.dimensions)
+        matrix = matrix.reshape(len(texts), self.dimensions).astype(np.float32)
+        # Sublinear term frequency, so boilerplate repeated in every document weighs less
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self.encode(texts[start:start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+
+def _google_embeddings(api_key):
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables")
+    embeddings = GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL, google_api_key=api_key)
+    return CachedEmbeddings(embeddings, settings.EMBEDDING_MODEL, EmbeddingCache(settings.EMBEDDING_CACHE_PATH))
+
+
+def _local_embeddings(api_key):
+    # Cheaper to recompute than to look up, so not cached
+    return HashingEmbeddings(settings.LOCAL_EMBEDDING_DIMENSIONS)
+
+
+# Values of settings.EMBEDDING_BACKEND
+EMBEDDING_BACKENDS = {
+    'google': _google_embeddings,
+    'local': _local_embeddings,
+}
+
+
+def get_embeddings(api_key=None):
+    """The embedder named by settings.EMBEDDING_BACKEND"""
+    try:
+        backend = EMBEDDING_BACKENDS[settings.EMBEDDING_BACKEND]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"EMBEDDING_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, not {settings.EMBEDDING_BACKEND!r}"
+        )
+    return backend(api_key)
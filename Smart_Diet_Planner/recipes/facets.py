@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.db.models.lookups import Exact
+
+from .catalog import get_catalog_version
+from .diets import DIET_TYPES, diet_bit
+from .models import Recipe
+
+DIET_FACETS_CACHE_KEY = 'recipes:diet_facets'
+DIET_FACETS_TIMEOUT = 60 * 60
+
+
+def _compute_diet_facets():
+    """Count recipes per diet type plus the catalog total in a single query"""
+    aggregates = {'total': Count('id')}
+    for i, diet in enumerate(DIET_TYPES):
+        bit = diet_bit(diet)
+        aggregates[f'diet_{i}'] = Count('id', filter=Exact(F('diet_mask').bitand(bit), bit))
+
+    row = Recipe.objects.aggregate(**aggregates)
+    diet_counts = {diet: row[f'diet_{i}'] for i, diet in enumerate(DIET_TYPES)}
+    return {'diet_counts': diet_counts, 'total': row['total']}
+
+
+def get_diet_facets():
+    """Return cached ``(diet_counts, total_recipes)`` for the recipe browse pages.
+
+    The cache key carries the catalog version read from the database, so a
+    write made by any process, bulk commands included, retires the counts
+    everywhere without an invalidation message.
+    """
+    key = f'{DIET_FACETS_CACHE_KEY}:{get_catalog_version()}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute_diet_facets()
+        cache.set(key, facets, DIET_FACETS_TIMEOUT)
+    return facets['diet_counts'], facets['total']
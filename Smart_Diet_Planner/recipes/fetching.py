@@ -0,0 +1,161 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, with bursts of up to ``capacity``"""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            self.sleep(wait_for)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, so a slow API does not throttle the others"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+class Checkpoint:
+    """Append-only file of finished recipe ids, so an interrupted run can resume"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['id'])
+                except (ValueError, KeyError):
+                    continue  # a line cut short by an interrupted write
+        return done
+
+    def mark(self, recipe_id):
+        if not self.path:
+            return
+        with self.lock, open(self.path, 'a') as f:
+            f.write(json.dumps({'id': recipe_id}) + '\n')
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ImageFetcher:
+    """Pooled HTTP session with per-host rate limiting and retries with exponential backoff"""
+
+    def __init__(self, concurrency=4, rate=1.0, retries=3, backoff=0.5, timeout=15, max_delay=30.0):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.limiter = HostRateLimiter(rate, burst=max(1, concurrency))
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_delay = max_delay
+
+    def _delay(self, attempt, response=None):
+        """Seconds to wait before the next attempt, None when the host asks for more than max_delay"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return int(retry_after) if int(retry_after) <= self.max_delay else None
+        return min(self.backoff * (2 ** attempt) * (1 + random.random() / 2), self.max_delay)
+
+    def get(self, url):
+        """GET with retries on connection errors and 429/5xx, returns the response or None"""
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(url)
+            response = None
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    return response if response.ok else None
+            except requests.RequestException:
+                pass
+            if attempt < self.retries:
+                delay = self._delay(attempt, response)
+                if delay is None:
+                    break  # not worth blocking a worker that long: the recipe fails and a re-run resumes it
+                time.sleep(delay)
+        return None
+
+    def get_json(self, url):
+        response = self.get(url)
+        try:
+            return response.json() if response is not None else None
+        except ValueError:
+            return None
+
+    def get_image(self, url):
+        """Image bytes from ``url``, None if it fails or is not an image"""
+        response = self.get(url)
+        if response is None or 'image' not in response.headers.get('content-type', ''):
+            return None
+        return response.content
+
+
+def run_concurrently(func, items, concurrency):
+    """Yield (item, func(item)) from a thread pool, keeping only a few items in flight.
+
+    Results are yielded in the calling thread, which is where database
+    writes should happen.
+    """
+    max_pending = concurrency * 2
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for item in items:
+            pending[pool.submit(func, item)] = item
+            if len(pending) >= max_pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield pending.pop(future), future.result()
+        for future in list(pending):
+            yield pending.pop(future), future.result()
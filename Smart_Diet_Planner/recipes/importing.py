@@ -0,0 +1,116 @@
+import csv
+import json
+import math
+from collections import Counter
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.utils.dateparse import parse_duration
+
+from .ingredients import index_recipes as index_recipe_ingredients
+from .models import Recipe
+from .search import index_recipes as index_recipe_search
+from .vector_index import updater
+
+# Columns an import file may set: every editable field except the image,
+# which in the public datasets is a slug rather than a stored file
+IMPORT_FIELDS = {
+    field.name: field for field in Recipe._meta.concrete_fields
+    if field.editable and not field.primary_key and field.name != 'image'
+}
+MISSING_VALUES = {'', 'na', 'nan', 'null', 'none'}
+
+
+def read_records(path, fmt=None):
+    """Yield one dict per CSV row or JSONL line without loading the file, None for unreadable lines"""
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            csv.field_size_limit(2 ** 31 - 1)  # instructions can be long
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def parse_duration_value(value):
+    """ISO 8601 ("PT1H25M"), "HH:MM:SS" or a bare number of minutes as a timedelta"""
+    if isinstance(value, (int, float)):
+        return timedelta(minutes=value)
+    value = str(value).strip()
+    if value.isdigit():
+        return timedelta(minutes=int(value))
+    duration = parse_duration(value)
+    if duration is None:
+        raise ValueError(f'Invalid duration: {value!r}')
+    return duration
+
+
+def _clean(field, value):
+    if value is None or (isinstance(value, str) and value.strip().lower() in MISSING_VALUES):
+        return None
+    if isinstance(field, models.DurationField):
+        return parse_duration_value(value)
+    if isinstance(field, models.FloatField):
+        value = float(value)
+        return None if math.isnan(value) else value
+    if isinstance(value, (list, tuple)):
+        # JSON arrays are stored in the quoted-list form parse_ingredients/parse_instructions read
+        if field.name == 'diet_types':
+            return ', '.join(str(item) for item in value)
+        return ', '.join(json.dumps(str(item)) for item in value)
+    return str(value).strip()
+
+
+def recipe_from_record(record):
+    """Unsaved Recipe with derived fields set, raises ValueError for a row that cannot be imported"""
+    if not isinstance(record, dict):
+        raise ValueError('Not a JSON object')
+    values = {name: _clean(field, record[name]) for name, field in IMPORT_FIELDS.items() if name in record}
+    if not values.get('recipe_name'):
+        raise ValueError('Missing recipe_name')
+    recipe = Recipe(**values)
+    recipe.set_derived_fields()
+    return recipe
+
+
+def _insert_batch(batch, stats):
+    with transaction.atomic():
+        existing = set(Recipe.objects.filter(recipe_name__in=list(batch)).values_list('recipe_name', flat=True))
+        stats['duplicates'] += len(existing)
+        created = Recipe.objects.bulk_create([recipe for name, recipe in batch.items() if name not in existing])
+        # bulk_create skips the post_save signal, so index the batch here
+        index_recipe_search(created)
+        index_recipe_ingredients(created)
+        transaction.on_commit(lambda: updater.enqueue(upserts=[recipe.pk for recipe in created]))
+    stats['imported'] += len(created)
+
+
+def import_recipes(records, batch_size=1000):
+    """Insert new recipes from ``records`` in batches, skipping names that already exist.
+
+    Returns a Counter of imported, duplicates and invalid rows.
+    """
+    stats = Counter(imported=0, duplicates=0, invalid=0)
+    batch = {}
+    for record in records:
+        try:
+            recipe = recipe_from_record(record)
+        except (ValueError, TypeError):
+            stats['invalid'] += 1
+            continue
+        if recipe.recipe_name in batch:
+            stats['duplicates'] += 1
+            continue
+        batch[recipe.recipe_name] = recipe
+        if len(batch) >= batch_size:
+            _insert_batch(batch, stats)
+            batch = {}
+    if batch:
+        _insert_batch(batch, stats)
+    return stats
@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Mapping
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+# settings.FAISS_INDEX_PATH holds one folder per save and a pointer file
+# naming the current one; the files of a version are never rewritten
+POINTER_FILE = 'CURRENT'
+INDEX_FILE = 'index.faiss'
+DOCUMENTS_FILE = 'documents.sqlite3'
+# Versions kept on disk: the current one and the one before it, which
+# readers that resolved the pointer just before a save may still open
+KEEP_VERSIONS = 2
+# Written at the top of the folder by FAISS.save_local()
+LEGACY_FILES = ('index.faiss', 'index.pkl')
+
+
+def _mappable_index(index):
+    """The vectors of a flat index as an IndexIVFFlat with a single list.
+
+    FAISS can only memory-map inverted lists, not flat storage. With one
+    list every vector is still compared, so results match the flat index.
+    """
+    vectors = index.reconstruct_n(0, index.ntotal)
+    quantizer = faiss.IndexFlat(index.d, index.metric_type)
+    quantizer.add(vectors[:1] * 0)  # IVFFlat stores raw vectors, the centroid is never used
+    mappable = faiss.IndexIVFFlat(quantizer, index.d, 1, index.metric_type)
+    mappable.is_trained = True
+    mappable.add(vectors)
+    return mappable
+
+
+def _write_documents(path, vectorstore):
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.execute(
+                'CREATE TABLE documents (position INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, '
+                'text TEXT NOT NULL, metadata TEXT NOT NULL)'
+            )
+            connection.executemany(
+                'INSERT INTO documents VALUES (?, ?, ?, ?)',
+                (
+                    (position, doc_id, document.page_content, json.dumps(document.metadata))
+                    for position, doc_id in sorted(vectorstore.index_to_docstore_id.items())
+                    for document in [vectorstore.docstore.search(doc_id)]
+                ),
+            )
+    finally:
+        connection.close()
+
+
+def current_version(path):
+    """Name of the version folder CURRENT points at, None when nothing was saved in this format"""
+    try:
+        with open(os.path.join(path, POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_vectorstore(vectorstore, path):
+    """Write the store into a new version folder under ``path``, then swap CURRENT to it.
+
+    The pointer is replaced in one os.replace(), so a reader always gets the
+    index and documents of the same save. Returns the new version.
+    """
+    os.makedirs(path, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix='.tmp-', dir=path)
+    try:
+        index = vectorstore.index
+        faiss.write_index(_mappable_index(index) if index.ntotal else index, os.path.join(scratch, INDEX_FILE))
+        _write_documents(os.path.join(scratch, DOCUMENTS_FILE), vectorstore)
+        version = f'v{time.time_ns():x}'
+        os.rename(scratch, os.path.join(path, version))
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    fd, pointer = tempfile.mkstemp(prefix='.tmp-', dir=path)
+    with os.fdopen(fd, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, POINTER_FILE))
+    _prune(path, version)
+    return version
+
+
+def _prune(path, current):
+    versions = sorted(name for name in os.listdir(path) if name.startswith('v') and name <= current)
+    # Open files stay readable after removal on POSIX; elsewhere removal may fail and is retried next save
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    for name in LEGACY_FILES:
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+
+
+class DocumentFile(Docstore):
+    """Read-only docstore over a saved documents.sqlite3.
+
+    Opened immutable, which is safe because a version's files are never
+    written again: every process reading the file shares it through the
+    page cache and only the rows a search returns are read.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(f'file:{path}?mode=ro&immutable=1', uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.positions = DocumentPositions(self)
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def search(self, search):
+        rows = self.query('SELECT text, metadata FROM documents WHERE id = ?', (search,))
+        if not rows:
+            return f"ID {search} not found."
+        text, metadata = rows[0]
+        return Document(id=search, page_content=text, metadata=json.loads(metadata))
+
+    def versions(self):
+        """{document id: updated_at the document was built from}"""
+        return dict(self.query("SELECT id, json_extract(metadata, '$.updated_at') FROM documents"))
+
+    def load(self):
+        """Every document, as an in-memory docstore"""
+        return InMemoryDocstore({
+            doc_id: Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+            for doc_id, text, metadata in self.query('SELECT id, text, metadata FROM documents')
+        })
+
+
+class DocumentPositions(Mapping):
+    """index_to_docstore_id for a DocumentFile, looked up per search result"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __getitem__(self, position):
+        rows = self.documents.query('SELECT id FROM documents WHERE position = ?', (int(position),))
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def __iter__(self):
+        return (position for position, in self.documents.query('SELECT position FROM documents ORDER BY position'))
+
+    def __len__(self):
+        return self.documents.query('SELECT COUNT(*) FROM documents')[0][0]
+
+    def items(self):
+        return self.documents.query('SELECT position, id FROM documents ORDER BY position')
+
+    def values(self):
+        return [doc_id for _, doc_id in self.items()]
+
+
+def load_vectorstore(path, embeddings, version=None):
+    """The saved store at ``path`` with its vectors memory-mapped and its documents read on demand"""
+    version = version or current_version(path)
+    if version is None:
+        # Saved by FAISS.save_local() before this format
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    folder = os.path.join(path, version)
+    index = faiss.read_index(os.path.join(folder, INDEX_FILE), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    documents = DocumentFile(os.path.join(folder, DOCUMENTS_FILE))
+    return FAISS(embeddings, index, documents, documents.positions)
+
+
+def has_saved_index(path):
+    return current_version(path) is not None or os.path.exists(os.path.join(path, 'index.pkl'))
+
+
+class SharedIndex:
+    """The store last saved at ``path``, reopened whenever a writer saves a new version.
+
+    Searches need no lock: a saved version never changes, and picking up a
+    new one only swaps the reference get() returns.
+    """
+
+    def __init__(self, path, embeddings):
+        self.path = path
+        self.embeddings = embeddings
+        self.version = None
+        self.vectorstore = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = current_version(self.path)
+        if self.vectorstore is None or version != self.version:
+            with self._lock:
+                if self.vectorstore is None or version != self.version:
+                    try:
+                        vectorstore = load_vectorstore(self.path, self.embeddings, version)
+                    except FileNotFoundError:
+                        # Pruned by saves made since the pointer was read
+                        version = current_version(self.path)
+                        vectorstore = load_vectorstore(self.path, self.embeddings, version)
+                    self.vectorstore, self.version = vectorstore, version
+        return self.vectorstore
+
+
+def make_writable(vectorstore):
+    """Copy a loaded store into memory so the index writer can change it.
+
+    Only IndexUpdater.attach() calls this; every other process keeps sharing
+    the mapped files and reopens the next saved version instead.
+    """
+    if not isinstance(vectorstore.docstore, DocumentFile):
+        return
+    index = vectorstore.index
+    flat = faiss.IndexFlat(index.d, index.metric_type)
+    if index.ntotal:
+        flat.add(index.reconstruct_n(0, index.ntotal))
+    vectorstore.docstore, vectorstore.index_to_docstore_id = (
+        vectorstore.docstore.load(), dict(vectorstore.index_to_docstore_id.items())
+    )
+    vectorstore.index = flat
+
+
+def document_versions(vectorstore):
+    """{document id: updated_at} for the documents in a store"""
+    if isinstance(vectorstore.docstore, DocumentFile):
+        return vectorstore.docstore.versions()
+    return {
+        doc_id: vectorstore.docstore.search(doc_id).metadata.get('updated_at')
+        for doc_id in vectorstore.index_to_docstore_id.values()
+    }
@@ -0,0 +1,130 @@
+import re
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+# Query terms that stand for a family of ingredients rather than one name
+INGREDIENT_GROUPS = {
+    'dairy': ['milk', 'cheese', 'butter', 'cream', 'yogurt', 'yoghurt', 'feta', 'parmesan', 'mozzarella', 'ghee', 'whey'],
+    'meat': ['beef', 'pork', 'chicken', 'turkey', 'lamb', 'bacon', 'ham', 'sausage', 'veal', 'duck'],
+    'seafood': ['fish', 'salmon', 'tuna', 'shrimp', 'prawn', 'cod', 'crab', 'lobster', 'anchovy', 'scallop'],
+    'gluten': ['wheat', 'flour', 'bread', 'pasta', 'barley', 'rye', 'couscous', 'noodles'],
+    'nuts': ['almond', 'walnut', 'pecan', 'cashew', 'peanut', 'hazelnut', 'pistachio', 'nut'],
+}
+
+
+def normalize_ingredient(name):
+    """Lowercase an ingredient name and strip punctuation so spellings collapse to one row"""
+    name = re.sub(r'[^\w\s]', ' ', (name or '').lower())
+    return re.sub(r'\s+', ' ', name).strip()[:100]
+
+
+def recipe_ingredient_names(recipe):
+    """Normalized, de-duplicated ingredient names for one recipe"""
+    names = {normalize_ingredient(item) for item in recipe.get_ingredients_list()}
+    names.discard('')
+    return names
+
+
+def _ingredient_ids(names):
+    """Map names to Ingredient ids, creating missing rows in one insert"""
+    if not names:
+        return {}
+    Ingredient.objects.bulk_create([Ingredient(name=name) for name in names], ignore_conflicts=True)
+    return dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+@transaction.atomic
+def index_recipes(recipes):
+    """(Re)build the ingredient links for a batch of recipes, returns the number of links written"""
+    recipes = [recipe for recipe in recipes if recipe.pk]
+    names_by_recipe = {recipe.pk: recipe_ingredient_names(recipe) for recipe in recipes}
+    ids = _ingredient_ids(set().union(*names_by_recipe.values()))
+
+    RecipeIngredient.objects.filter(recipe_id__in=names_by_recipe).delete()
+    links = [
+        RecipeIngredient(recipe_id=recipe_id, ingredient_id=ids[name])
+        for recipe_id, names in names_by_recipe.items()
+        for name in names
+    ]
+    RecipeIngredient.objects.bulk_create(links, ignore_conflicts=True)
+    return len(links)
+
+
+def sync_recipe_ingredients(recipe):
+    """Update one recipe's links only if its ingredient names changed"""
+    names = recipe_ingredient_names(recipe)
+    current = set(
+        RecipeIngredient.objects.filter(recipe=recipe).values_list('ingredient__name', flat=True)
+    )
+    if names != current:
+        index_recipes([recipe])
+
+
+def parse_ingredient_query(text):
+    """Split "chicken AND spinach, NOT dairy" into (include, exclude) term lists"""
+    include, exclude = [], []
+    for part in re.split(r',|\bAND\b|&|(?=\bNOT\b)', text or '', flags=re.IGNORECASE):
+        part = part.strip()
+        negated = re.match(r'^(?:NOT\b|-|!)\s*(.*)$', part, flags=re.IGNORECASE)
+        if negated:
+            term = normalize_ingredient(negated.group(1))
+            if term:
+                exclude.append(term)
+        else:
+            term = normalize_ingredient(part)
+            if term:
+                include.append(term)
+    return include, exclude
+
+
+def term_variants(term):
+    """Spellings a query term may appear as: group members plus plural/singular forms"""
+    variants = set()
+    for word in INGREDIENT_GROUPS.get(term, [term]):
+        variants.update({word, f'{word}s', f'{word}es'})
+        if word.endswith('s'):
+            variants.add(word[:-1])
+    return variants
+
+
+def _term_filter(term):
+    """Q matching Ingredient names that contain ``term`` as a whole word (or its plural)"""
+    condition = Q()
+    for variant in term_variants(term):
+        condition |= (
+            Q(name=variant) |
+            Q(name__startswith=f'{variant} ') |
+            Q(name__endswith=f' {variant}') |
+            Q(name__contains=f' {variant} ')
+        )
+    return condition
+
+
+def _has_any(ingredient_ids):
+    return Exists(RecipeIngredient.objects.filter(recipe=OuterRef('pk'), ingredient_id__in=ingredient_ids))
+
+
+def recipes_with_ingredients(include=(), exclude=(), queryset=None):
+    """Recipes containing every ``include`` term and none of the ``exclude`` terms.
+
+    Terms are resolved against the small Ingredient vocabulary first; the
+    recipe side is then answered through the indexed RecipeIngredient links.
+    """
+    recipes = Recipe.objects.all() if queryset is None else queryset
+    for term in include:
+        ids = list(Ingredient.objects.filter(_term_filter(term)).values_list('id', flat=True))
+        if not ids:
+            return recipes.none()
+        recipes = recipes.filter(_has_any(ids))
+
+    excluded = Q()
+    for term in exclude:
+        excluded |= _term_filter(term)
+    if exclude:
+        ids = list(Ingredient.objects.filter(excluded).values_list('id', flat=True))
+        if ids:
+            recipes = recipes.filter(~_has_any(ids))
+    return recipes
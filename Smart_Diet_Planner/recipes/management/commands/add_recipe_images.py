@@ -1,9 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db.models import Q
 from recipes.models import Recipe
 from django.core.files.base import ContentFile
-import requests
-import time
+from recipes.fetching import Checkpoint, ImageFetcher, run_concurrently
+from urllib.parse import quote
 import random
 import os
 
@@ -23,10 +24,48 @@ class Command(BaseCommand):
             action='store_true',
             help='Replace existing images'
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of images to download in parallel (api method)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=1.0,
+            help='Requests per second allowed to each image host'
+        )
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=3,
+            help='Retries for a failed or throttled request, with exponential backoff'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=30.0,
+            help='Longest wait between retries; a host asking for more in Retry-After counts as a failure'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=os.path.join(settings.BASE_DIR, '.add_recipe_images.checkpoint'),
+            help='File recording finished recipes so an interrupted run can resume'
+        )
+        parser.add_argument(
+            '--image-source',
+            type=str,
+            default='',
+            help='URL template with a {query} placeholder to download from instead of the public APIs'
+        )
 
     def handle(self, *args, **options):
         method = options['method']
         force = options['force']
+        self.options = options
+        self.concurrency = max(1, options['concurrency'])
         
         self.stdout.write(
             self.style.SUCCESS(f'🚀 Starting recipe image addition using {method} method...')
@@ -37,7 +76,7 @@ class Command(BaseCommand):
             recipes = Recipe.objects.all()
             self.stdout.write(f'📋 Processing ALL {recipes.count()} recipes (force mode)')
         else:
-            recipes = Recipe.objects.filter(image__isnull=True)
+            recipes = Recipe.objects.filter(Q(image__isnull=True) | Q(image=''))
             self.stdout.write(f'📋 Processing {recipes.count()} recipes without images')
         
         if not recipes.exists():
@@ -62,81 +101,58 @@ class Command(BaseCommand):
         )
 
     def add_api_images(self, recipes):
-        """Add real food images from APIs"""
+        """Download real food images from APIs with a pool of worker threads"""
+        fetcher = ImageFetcher(
+            concurrency=self.concurrency, rate=self.options['rate'], retries=self.options['retries'],
+            max_delay=self.options['max_delay'],
+        )
+        checkpoint = Checkpoint(self.options['checkpoint'])
+        done = checkpoint.load()
+        if done:
+            self.stdout.write(f'⏩ Resuming: skipping {len(done)} recipes finished in an earlier run')
+        recipes = [recipe for recipe in recipes.iterator() if recipe.id not in done]
+        total = len(recipes)
         success_count = 0
-        total = recipes.count()
-        
-        for i, recipe in enumerate(recipes, 1):
+
+        def fetch(recipe):
+            for url in self.get_food_image_urls(recipe, fetcher):
+                content = fetcher.get_image(url)
+                if content:
+                    return content
+            return None
+
+        for i, (recipe, content) in enumerate(run_concurrently(fetch, recipes, self.concurrency), 1):
             self.stdout.write(f'📥 [{i}/{total}] Processing: {recipe.recipe_name}')
-            
-            # Try to get a food image
-            image_url = self.get_food_image_url(recipe)
-            
-            if image_url:
-                image_file = self.download_image(image_url, recipe.recipe_name)
-                if image_file:
-                    try:
-                        filename = f"{recipe.recipe_name.lower().replace(' ', '_')[:50]}.jpg"
-                        recipe.image.save(filename, image_file, save=True)
-                        self.stdout.write(f'   ✅ Added image successfully')
-                        success_count += 1
-                    except Exception as e:
-                        self.stdout.write(f'   ❌ Error saving: {e}')
-                else:
-                    self.stdout.write(f'   ⚠️  Failed to download image')
-            else:
-                self.stdout.write(f'   ⚠️  No image URL found')
-            
-            # Small delay to be respectful to APIs
-            time.sleep(1)
-        
+            if not content:
+                self.stdout.write(f'   ⚠️  Failed to download image')
+                continue
+            try:
+                filename = f"{recipe.recipe_name.lower().replace(' ', '_').replace('/', '_')[:50]}.jpg"
+                recipe.image.save(filename, ContentFile(content), save=True)
+            except Exception as e:
+                self.stdout.write(f'   ❌ Error saving: {e}')
+                continue
+            checkpoint.mark(recipe.id)
+            self.stdout.write(f'   ✅ Added image successfully')
+            success_count += 1
+
+        if success_count == total:
+            checkpoint.clear()
         self.stdout.write(
             self.style.SUCCESS(f'✅ Successfully added {success_count}/{total} images')
         )
 
-    def get_food_image_url(self, recipe):
-        """Get food image URL for recipe"""
-        # Try different approaches
-        urls_to_try = [
-            f"https://source.unsplash.com/400x300/?{recipe.recipe_name.replace(' ', '%20')},food",
-            f"https://source.unsplash.com/400x300/?food,meal,{random.randint(1,1000)}",
-            "https://foodish-api.herokuapp.com/api/"
-        ]
-        
-        for url in urls_to_try:
-            if "foodish" in url:
-                try:
-                    response = requests.get(url, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        return data.get('image')
-                except:
-                    continue
-            else:
-                return url
-        
-        return None
-
-    def download_image(self, url, recipe_name):
-        """Download image from URL"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            # Validate content type
-            content_type = response.headers.get('content-type', '')
-            if 'image' not in content_type:
-                return None
-            
-            filename = f"{recipe_name.lower().replace(' ', '_')[:50]}.jpg"
-            return ContentFile(response.content, name=filename)
-            
-        except Exception as e:
-            self.stdout.write(f'   ❌ Download error: {e}')
-            return None
+    def get_food_image_urls(self, recipe, fetcher):
+        """Candidate image URLs for a recipe, best match first"""
+        query = quote(recipe.recipe_name)
+        if self.options['image_source']:
+            yield self.options['image_source'].format(query=query)
+            return
+        yield f"https://source.unsplash.com/400x300/?{query},food"
+        data = fetcher.get_json("https://foodish-api.herokuapp.com/api/")
+        if data and data.get('image'):
+            yield data['image']
+        yield f"https://source.unsplash.com/400x300/?food,meal,{random.randint(1,1000)}"
 
     def add_placeholder_images(self, recipes):
         """Add custom generated placeholder images"""
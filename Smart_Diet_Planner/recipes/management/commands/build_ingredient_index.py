@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from recipes.ingredients import index_recipes
+from recipes.models import Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = 'Build the ingredient inverted index (Ingredient / RecipeIngredient) from parsed recipe ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Re-index every recipe instead of only recipes without ingredient links'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of recipes indexed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        recipes = Recipe.objects.only('id', 'ingredients', 'ingredients_list').order_by('id')
+        if options['rebuild']:
+            self.stdout.write('Rebuilding ingredient index for all recipes...')
+        else:
+            recipes = recipes.exclude(id__in=RecipeIngredient.objects.values('recipe_id'))
+            self.stdout.write('Indexing recipes without ingredient links...')
+
+        recipe_count = link_count = 0
+        batch = []
+        for recipe in recipes.iterator(chunk_size=batch_size):
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                link_count += index_recipes(batch)
+                recipe_count += len(batch)
+                batch = []
+        if batch:
+            link_count += index_recipes(batch)
+            recipe_count += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {recipe_count} recipes ({link_count} ingredient links)!')
+        )
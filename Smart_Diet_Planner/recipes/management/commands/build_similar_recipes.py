@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from recipes.similar import SIMILAR_COUNT, build_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Precompute the "similar recipes" shown on recipe pages from nutrition, category and ingredient vectors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=SIMILAR_COUNT,
+            help='Neighbours stored per recipe'
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            help='Recipes compared against the catalog per matrix product (default: sized to the catalog)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Building similar recipe table...')
+        count = build_similar_recipes(options['count'], options['block_size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} similar recipe links!'))
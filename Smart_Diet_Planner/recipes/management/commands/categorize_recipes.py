@@ -1,147 +1,106 @@
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from recipes.categorize import classify, classify_sharded, content_hash
+from recipes.diets import canonical_diet, diet_mask_for, parse_diet_types
+from recipes.facets import get_diet_facets
 from recipes.models import Recipe
 
 
 class Command(BaseCommand):
     help = 'Categorize recipes based on their nutritional profile and ingredients'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Recipes written per UPDATE transaction'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes to shard the keyword matching across on large catalogs'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Reprocess every recipe, not only those whose inputs changed since the last run'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting recipe categorization...'))
-        
-        recipes = Recipe.objects.all()
-        updated_count = 0
-        
-        for recipe in recipes:
-            old_diet_types = recipe.diet_types
-            new_diet_types = self.categorize_recipe(recipe)
-            
-            if new_diet_types != old_diet_types:
-                recipe.diet_types = new_diet_types
-                recipe.save()
-                updated_count += 1
-                self.stdout.write(f"Updated {recipe.recipe_name}: {new_diet_types}")
-        
+
+        rows = Recipe.objects.order_by('id').values_list(
+            'id', 'recipe_name', 'type', 'protein', 'carbohydrate', 'fat', 'diet_types', 'diet_mask', 'category_hash'
+        )
+        # Only recipes whose name/type/macros (or the rules) changed need the rules run again
+        pending, hashes = [], []
+        skipped_count = 0
+        for row in rows.iterator(chunk_size=options['batch_size']):
+            digest = content_hash(*row[1:6])
+            if digest == row[8] and not options['full']:
+                skipped_count += 1
+                continue
+            pending.append(row)
+            hashes.append(digest)
+        labels = classify_sharded([row[1:6] for row in pending], workers=options['workers'])
+
+        masks = {}
+        changes, unchanged = [], []
+        for (recipe_id, recipe_name, *_, old_diet_types, old_diet_mask, _), new_diet_types, digest in zip(pending, labels, hashes):
+            if new_diet_types not in masks:
+                masks[new_diet_types] = diet_mask_for(parse_diet_types(new_diet_types))
+            new_diet_mask = masks[new_diet_types]
+            if new_diet_types != old_diet_types or new_diet_mask != old_diet_mask:
+                changes.append((new_diet_types, new_diet_mask, digest, recipe_id))
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"Updated {recipe_name}: {new_diet_types}")
+            else:
+                unchanged.append((digest, recipe_id))
+        updated_count = len(changes)
+
+        self.save_changes(changes, unchanged, options['batch_size'])
         self.stdout.write(
             self.style.SUCCESS(f'Successfully categorized {updated_count} recipes!')
         )
-        
+        self.stdout.write(
+            f'{len(pending)} reprocessed ({updated_count} updated), {skipped_count} skipped as unchanged'
+        )
+
         # Check coverage for each diet type
         self.check_diet_coverage()
-    
+
+    def save_changes(self, changes, unchanged, batch_size):
+        """Write new labels and category hashes in chunked transactions
+
+        A recipe's hash is written in the same UPDATE as its new labels, so an
+        interrupted run never leaves a current hash next to stale labels. The
+        new updated_at moves the catalog version, which retires the diet
+        facets and catalog indexes in every process.
+        """
+        table = Recipe._meta.db_table
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        update_labels = (
+            f'UPDATE {table} SET diet_types = %s, diet_mask = %s, category_hash = %s, updated_at = %s WHERE id = %s'
+        )
+        # Hash-only writes leave updated_at alone: nothing a page shows changed
+        update_hash = f'UPDATE {table} SET category_hash = %s WHERE id = %s'
+        for start in range(0, len(changes), batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(update_labels, [
+                    (diet_types, diet_mask, digest, now, recipe_id)
+                    for diet_types, diet_mask, digest, recipe_id in changes[start:start + batch_size]
+                ])
+        for start in range(0, len(unchanged), batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(update_hash, unchanged[start:start + batch_size])
+
     def categorize_recipe(self, recipe):
         """Categorize recipe based on nutritional profile and ingredients"""
-        diet_types = []
-        
-        # Get nutritional values (per 100g)
-        calories = recipe.calories or 0
-        protein = recipe.protein or 0
-        carbs = recipe.carbohydrate or 0  # Using correct field name
-        fats = recipe.fat or 0  # Using correct field name
-        fiber = recipe.fiber or 0
-        
-        # Calculate percentages for macro analysis
-        total_macros = protein * 4 + carbs * 4 + fats * 9
-        if total_macros > 0:
-            protein_pct = (protein * 4) / total_macros * 100
-            carb_pct = (carbs * 4) / total_macros * 100
-            fat_pct = (fats * 9) / total_macros * 100
-        else:
-            protein_pct = carb_pct = fat_pct = 0
-        
-        # Get recipe name and type for analysis
-        name = recipe.recipe_name.lower()  # Using correct field name
-        recipe_type = recipe.type.lower() if recipe.type else ""
-        
-        # Ketogenic Diet (High fat >70%, very low carb <10%)
-        if fat_pct > 65 and carb_pct < 15:
-            diet_types.append("Ketogenic")
-        elif any(keto_word in name for keto_word in ["keto", "ketogenic", "fat bomb"]):
-            diet_types.append("Ketogenic")
-        elif recipe_type == "keto":
-            diet_types.append("Ketogenic")
-        
-        # Paleo Diet (no grains, dairy, legumes, processed foods)
-        paleo_friendly = True
-        paleo_avoid = ["bread", "pasta", "rice", "oats", "quinoa", "beans", "lentils", 
-                      "cheese", "milk", "yogurt", "peanut", "soy"]
-        
-        if any(avoid in name for avoid in paleo_avoid):
-            paleo_friendly = False
-        elif recipe_type == "paleo":
-            paleo_friendly = True
-        elif any(paleo_word in name for paleo_word in ["paleo", "caveman"]):
-            paleo_friendly = True
-        
-        if paleo_friendly and not any(avoid in name for avoid in paleo_avoid):
-            diet_types.append("Paleo")
-        
-        # Vegan Diet (no animal products)
-        vegan_indicators = ["vegan", "plant-based", "tofu", "quinoa", "lentil", "chickpea"]
-        animal_products = ["meat", "chicken", "beef", "pork", "fish", "salmon", "tuna", 
-                          "egg", "cheese", "milk", "cream", "butter", "bacon", "ham"]
-        
-        is_vegan = False
-        if any(vegan in name for vegan in vegan_indicators):
-            is_vegan = True
-        elif recipe_type == "vegan":
-            is_vegan = True
-        elif not any(animal in name for animal in animal_products):
-            # If no obvious animal products and contains plant proteins
-            plant_proteins = ["beans", "lentils", "chickpea", "tofu", "quinoa", "nuts"]
-            if any(plant in name for plant in plant_proteins):
-                is_vegan = True
-        
-        if is_vegan:
-            diet_types.append("Vegan")
-            diet_types.append("Vegetarian")  # Vegan is also vegetarian
-        
-        # Vegetarian Diet (no meat, but may include dairy/eggs)
-        meat_products = ["meat", "chicken", "beef", "pork", "fish", "salmon", "tuna", 
-                        "bacon", "ham", "turkey", "lamb"]
-        
-        if not any(meat in name for meat in meat_products) and "Vegan" not in diet_types:
-            diet_types.append("Vegetarian")
-        
-        # Mediterranean Diet (olive oil, fish, vegetables, whole grains)
-        med_indicators = ["mediterranean", "olive", "fish", "salmon", "tuna", "tomato", 
-                         "herbs", "Greek", "Italian"]
-        
-        if any(med in name for med in med_indicators):
-            diet_types.append("Mediterranean")
-        elif recipe_type == "mediterranean":
-            diet_types.append("Mediterranean")
-        
-        # Low Carb Diet (carbs < 30% of calories)
-        if carb_pct < 30 and carbs < 20:
-            diet_types.append("Low Carb")
-        elif any(low_carb in name for low_carb in ["low carb", "low-carb", "no carb"]):
-            diet_types.append("Low Carb")
-        
-        # High Protein Diet (protein > 25% of calories or >20g per serving)
-        if protein_pct > 25 or protein > 20:
-            diet_types.append("High Protein")
-        elif any(protein_word in name for protein_word in ["protein", "lean", "muscle"]):
-            diet_types.append("High Protein")
-        
-        # Gluten Free Diet (no wheat, barley, rye)
-        gluten_sources = ["bread", "pasta", "wheat", "flour", "barley", "rye", "oats"]
-        gluten_free_indicators = ["gluten-free", "gluten free", "rice", "quinoa"]
-        
-        has_gluten = any(gluten in name for gluten in gluten_sources)
-        is_gluten_free = any(gf in name for gf in gluten_free_indicators)
-        
-        if not has_gluten or is_gluten_free:
-            diet_types.append("Gluten Free")
-        
-        # Balanced Diet (default for recipes that don't fit other categories)
-        if not diet_types:
-            diet_types.append("Balanced")
-        elif len(diet_types) == 1 and diet_types[0] in ["Vegetarian", "Gluten Free"]:
-            # Add Balanced for simple vegetarian or gluten-free recipes
-            diet_types.append("Balanced")
-        
-        return ", ".join(sorted(set(diet_types)))
-    
+        return classify([(recipe.recipe_name, recipe.type, recipe.protein, recipe.carbohydrate, recipe.fat)])[0]
+
     def check_diet_coverage(self):
         """Check if each diet type has at least one recipe"""
         diet_types = ["Balanced", "Ketogenic", "Paleo", "Vegetarian", "Vegan", 
@@ -151,9 +110,10 @@ class Command(BaseCommand):
         self.stdout.write("DIET TYPE COVERAGE:")
         self.stdout.write("="*50)
         
+        # One cached aggregate over diet_mask instead of a count per diet
+        diet_counts, _ = get_diet_facets()
         for diet_type in diet_types:
-            recipes = Recipe.objects.filter(diet_types__icontains=diet_type)
-            count = recipes.count()
+            count = diet_counts[canonical_diet(diet_type)]
             
             if count > 0:
                 self.stdout.write(
@@ -165,9 +125,9 @@ class Command(BaseCommand):
                 )
         
         # If any diet types are missing, create sample recipes
-        self.create_missing_diet_recipes()
+        self.create_missing_diet_recipes(diet_counts)
     
-    def create_missing_diet_recipes(self):
+    def create_missing_diet_recipes(self, diet_counts):
         """Create sample recipes for missing diet types"""
         diet_types = ["Balanced", "Ketogenic", "Paleo", "Vegetarian", "Vegan", 
                      "Mediterranean", "Low Carb", "High Protein", "Gluten Free"]
@@ -222,9 +182,7 @@ class Command(BaseCommand):
         
         created_count = 0
         for diet_type in diet_types:
-            existing_recipes = Recipe.objects.filter(diet_types__icontains=diet_type)
-            
-            if existing_recipes.count() == 0:
+            if diet_counts[canonical_diet(diet_type)] == 0:
                 recipe_data = sample_recipes[diet_type]
                 
                 # Check if this exact recipe already exists
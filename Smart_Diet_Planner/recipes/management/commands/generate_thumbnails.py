@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.thumbnails import refresh_thumbnails, thumbnails_stale
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive WebP/JPEG thumbnails and inline placeholders for recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate thumbnails even for recipes whose variants are up to date'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_variants', 'image_placeholder')
+
+        generated = skipped = failed = 0
+        for recipe in recipes.order_by('id').iterator(chunk_size=200):
+            if not options['force'] and not thumbnails_stale(recipe):
+                skipped += 1
+                continue
+            if refresh_thumbnails(recipe):
+                generated += 1
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f'Could not read image for {recipe.pk}: {recipe.image.name}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated thumbnails for {generated} recipes ({skipped} up to date, {failed} failed)!')
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.importing import import_recipes, read_records
+
+
+class Command(BaseCommand):
+    help = 'Import recipes from CSV or JSONL files, skipping names that already exist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='CSV or JSONL (.jsonl/.ndjson) files to import')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='File format, by default taken from the file extension'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Recipes inserted per transaction'
+        )
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            self.stdout.write(f'Importing {path}...')
+            try:
+                stats = import_recipes(read_records(path, options['format']), options['batch_size'])
+            except OSError as e:
+                raise CommandError(f'Could not read {path}: {e}')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Imported {stats['imported']} recipes "
+                    f"({stats['duplicates']} duplicates skipped, {stats['invalid']} invalid rows)!"
+                )
+            )
+        self.stdout.write('Run `python manage.py categorize_recipes` to tag diet types on the new recipes.')
@@ -206,5 +206,5 @@ class Command(BaseCommand):
         # Display diet type summary
         self.stdout.write('\nAvailable diet types:')
         for diet_type in Recipe.get_available_diet_types():
-            count = Recipe.objects.filter(diet_types__icontains=diet_type).count()
+            count = Recipe.objects.with_diet(diet_type).count()
             self.stdout.write(f'  {diet_type}: {count} recipes')
\ No newline at end of file
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from recipes.embeddings import get_embeddings
+from recipes.index_store import has_saved_index, load_vectorstore
+from recipes.vector_index import IndexUpdater
+
+
+class Command(BaseCommand):
+    help = 'Apply recipe changes to the chatbot FAISS index and save a new version for the servers to reopen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running and sync every --interval seconds (run one of these per deployment)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.FAISS_PERSIST_INTERVAL,
+            help='Seconds between syncs with --watch'
+        )
+
+    def handle(self, *args, **options):
+        path = settings.FAISS_INDEX_PATH
+        if not has_saved_index(path):
+            raise CommandError(f'No FAISS index at {path}; run `python regenerate_faiss.py` first')
+        updater = IndexUpdater()
+        updater.attach(load_vectorstore(path, get_embeddings(settings.GOOGLE_API_KEY)), path, start=False)
+        while True:
+            touched = updater.flush()
+            updater.persist()
+            if touched or not options['watch']:
+                self.stdout.write(self.style.SUCCESS(f'Updated {touched} documents in the FAISS index!'))
+            if not options['watch']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
+            updater.reconcile()
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:27
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copy of recipes.diets as of this migration, so later changes to the
+# live module cannot change what the backfill writes
+DIET_TYPES = [
+    'Balanced',
+    'Ketogenic (Keto)',
+    'Paleo',
+    'Vegetarian',
+    'Vegan',
+    'Mediterranean',
+    'Low Carb',
+    'High Protein',
+    'Gluten Free',
+]
+DIET_ALIASES = {
+    'keto': 'Ketogenic (Keto)',
+    'plant based': 'Vegan',
+}
+
+
+def _diet_key(name):
+    key = re.sub(r'\(.*?\)', ' ', name or '').lower()
+    key = re.sub(r'[-_\s]+', ' ', key)
+    return key.strip()
+
+
+DIET_BITS = {_diet_key(diet): 1 << i for i, diet in enumerate(DIET_TYPES)}
+DIET_BITS.update((_diet_key(alias), DIET_BITS[_diet_key(diet)]) for alias, diet in DIET_ALIASES.items())
+
+
+def diet_mask_for(diet_types):
+    mask = 0
+    for name in (diet_types or '').split(','):
+        if name.strip():
+            mask |= DIET_BITS.get(_diet_key(name.strip()), 0)
+    return mask
+
+
+def backfill_diet_mask(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    for recipe in Recipe.objects.only('id', 'diet_types').iterator(chunk_size=2000):
+        recipe.diet_mask = diet_mask_for(recipe.diet_types)
+        if recipe.diet_mask:
+            batch.append(recipe)
+        if len(batch) >= 2000:
+            Recipe.objects.bulk_update(batch, ['diet_mask'])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ['diet_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_diet_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='diet_mask',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, help_text='Bitmask of diet types, derived from diet_types'),
+        ),
+        migrations.RunPython(backfill_diet_mask, migrations.RunPython.noop),
+    ]
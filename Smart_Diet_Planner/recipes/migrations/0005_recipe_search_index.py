@@ -0,0 +1,52 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import recipes.models
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "recipe_name, ingredients, type, cuisine, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 1.0)')")
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, recipe_name, ingredients, type, cuisine) "
+        "SELECT id, recipe_name, COALESCE(ingredients, ''), COALESCE(type, ''), COALESCE(cuisine, '') "
+        "FROM recipes_recipe"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_diet_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchIndex',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe')),
+                ('document', recipes.models.SearchDocumentField(db_column='recipes_recipe_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['recipe_name', 'id'], name='recipe_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:32
+
+import ast
+
+from django.db import migrations, models
+
+
+# Frozen copies of recipes.parsing as of this migration, so later changes to
+# the live module cannot change what the backfill writes
+def parse_instructions(instructions):
+    try:
+        if instructions.startswith("c("):
+            cleaned = instructions.replace('c(', '').rstrip(')').strip()
+            return [i.strip('" ').strip() for i in cleaned.split('",')]
+        steps = ast.literal_eval(instructions)
+        if isinstance(steps, (list, tuple)):
+            return [str(step) for step in steps]
+        return [str(steps)]
+    except Exception:
+        return [instructions] if instructions else []
+
+
+def parse_ingredients(ingredients):
+    if not ingredients:
+        return []
+    try:
+        cleaned = ingredients.strip()
+        if cleaned.startswith("c("):
+            cleaned = cleaned[2:-1]
+        items = ast.literal_eval(f"[{cleaned}]")
+        return [item.capitalize() for item in items]
+    except Exception:
+        return [ingredients]
+
+
+def backfill_parsed_lists(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    batch = []
+    recipes = Recipe.objects.only('id', 'ingredients', 'instructions')
+    for recipe in recipes.iterator(chunk_size=1000):
+        recipe.ingredients_list = parse_ingredients(recipe.ingredients)
+        recipe.instructions_list = parse_instructions(recipe.instructions)
+        batch.append(recipe)
+        if len(batch) >= 1000:
+            Recipe.objects.bulk_update(batch, ['ingredients_list', 'instructions_list'])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ['ingredients_list', 'instructions_list'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_name_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_list',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Parsed from ingredients on save'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='instructions_list',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Parsed from instructions on save'),
+        ),
+        migrations.RunPython(backfill_parsed_lists, migrations.RunPython.noop),
+    ]
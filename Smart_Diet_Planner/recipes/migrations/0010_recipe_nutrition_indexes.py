@@ -0,0 +1,55 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:39
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_protein_per_calorie(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.filter(protein__isnull=False, calories__gt=0).update(
+        protein_per_calorie=F('protein') / F('calories')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='protein_per_calorie',
+            field=models.FloatField(blank=True, editable=False, help_text='Grams of protein per kcal, derived from protein and calories', null=True),
+        ),
+        migrations.RunPython(backfill_protein_per_calorie, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['calories', 'id'], name='recipe_calories_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['protein', 'id'], name='recipe_protein_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['carbohydrate', 'id'], name='recipe_carbohydrate_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['fat', 'id'], name='recipe_fat_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['fiber', 'id'], name='recipe_fiber_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['sodium', 'id'], name='recipe_sodium_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['protein_per_calorie', 'id'], name='recipe_protein_density_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny blurred data URI shown while the image loads'),
+        ),
+    ]
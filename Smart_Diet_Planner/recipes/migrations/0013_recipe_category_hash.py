@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='category_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash of the fields categorize_recipes read on its last run', max_length=16),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_similar_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='similarrecipe',
+            name='built_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
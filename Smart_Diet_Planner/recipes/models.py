@@ -1,5 +1,18 @@
 from django.db import models
-import ast
+from django.db.models import Lookup
+from .diets import DIET_TYPES, diet_bit, diet_mask_for, masks_with_bit, parse_diet_types
+from .nutrition import protein_density
+from .parsing import parse_ingredients, parse_instructions
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_diet(self, diet_type):
+        """Filter recipes tagged with a diet type using the indexed diet_mask"""
+        bit = diet_bit(diet_type)
+        if not bit:
+            return self.none()
+        return self.filter(diet_mask__in=masks_with_bit(bit))
+
 
 class Recipe(models.Model):
     recipe_name = models.CharField(max_length=255, null=False, blank=False)
@@ -16,42 +29,76 @@ class Recipe(models.Model):
     fiber = models.FloatField(null=True, blank=True)
     sugar = models.FloatField(null=True, blank=True)
     protein = models.FloatField(null=True, blank=True)
+    protein_per_calorie = models.FloatField(null=True, blank=True, editable=False, help_text="Grams of protein per kcal, derived from protein and calories")
     instructions = models.TextField(null=True, blank=True)
+    ingredients_list = models.JSONField(default=list, blank=True, editable=False, help_text="Parsed from ingredients on save")
+    instructions_list = models.JSONField(default=list, blank=True, editable=False, help_text="Parsed from instructions on save")
     type = models.CharField(max_length=50, null=True, blank=True)
     cuisine = models.CharField(max_length=100, null=True, blank=True)
     diet_types = models.CharField(max_length=200, null=True, blank=True, help_text="Comma-separated diet types")
+    diet_mask = models.PositiveIntegerField(default=0, db_index=True, editable=False, help_text="Bitmask of diet types, derived from diet_types")
+    category_hash = models.CharField(max_length=16, blank=True, default='', editable=False, help_text="Hash of the fields categorize_recipes read on its last run")
     image = models.ImageField(upload_to='recipes/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Generated thumbnail widths, see recipes.thumbnails")
+    image_placeholder = models.TextField(blank=True, default='', editable=False, help_text="Tiny blurred data URI shown while the image loads")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
+    objects = RecipeQuerySet.as_manager()
 
-    
-    def get_instructions_list(self):
-        try:
-            if self.instructions.startswith("c("):  # R-style vector
-                cleaned = self.instructions.replace('c(', '').rstrip(')').strip()
-                return [i.strip('" ').strip() for i in cleaned.split('",')]
-            return ast.literal_eval(self.instructions)  
-        except Exception:
-            return [self.instructions] if self.instructions else []
+    class Meta:
+        indexes = [
+            # Keyset pagination of the browse pages seeks on (recipe_name, id)
+            models.Index(fields=['recipe_name', 'id'], name='recipe_name_id_idx'),
+            # Nutrition range filters and sorts, see recipes.nutrition
+            models.Index(fields=['calories', 'id'], name='recipe_calories_id_idx'),
+            models.Index(fields=['protein', 'id'], name='recipe_protein_id_idx'),
+            models.Index(fields=['carbohydrate', 'id'], name='recipe_carbohydrate_id_idx'),
+            models.Index(fields=['fat', 'id'], name='recipe_fat_id_idx'),
+            models.Index(fields=['fiber', 'id'], name='recipe_fiber_id_idx'),
+            models.Index(fields=['sodium', 'id'], name='recipe_sodium_id_idx'),
+            models.Index(fields=['protein_per_calorie', 'id'], name='recipe_protein_density_idx'),
+        ]
+
+    # Columns derived on save from the raw field they are computed from
+    DERIVED_FIELDS = {
+        'diet_types': 'diet_mask',
+        'ingredients': 'ingredients_list',
+        'instructions': 'instructions_list',
+        'protein': 'protein_per_calorie',
+        'calories': 'protein_per_calorie',
+    }
+
+    def set_derived_fields(self):
+        """Compute DERIVED_FIELDS from their sources; bulk_create callers must call this themselves"""
+        self.diet_mask = diet_mask_for(self.get_diet_types_list())
+        self.ingredients_list = parse_ingredients(self.ingredients)
+        self.instructions_list = parse_instructions(self.instructions)
+        self.protein_per_calorie = protein_density(self.protein, self.calories)
 
+    def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'updated_at'} | {
+                derived for source, derived in self.DERIVED_FIELDS.items() if source in update_fields
+            }
+        super().save(*args, **kwargs)
+
+    def get_instructions_list(self):
+        """Instruction steps, parsed once when the recipe was saved"""
+        if self.instructions_list or not self.instructions:
+            return self.instructions_list
+        return parse_instructions(self.instructions)  # row not re-saved since the column was added
 
     def get_ingredients_list(self):
-        if not self.ingredients:
-            return []
-        try:
-            # converting to list
-            cleaned = self.ingredients.strip()
-            if cleaned.startswith("c("):
-                cleaned = cleaned[2:-1]
-            items = ast.literal_eval(f"[{cleaned}]")
-            return [item.capitalize() for item in items]
-        except Exception:
-            return [self.ingredients]
+        """Ingredient names, parsed once when the recipe was saved"""
+        if self.ingredients_list or not self.ingredients:
+            return self.ingredients_list
+        return parse_ingredients(self.ingredients)  # row not re-saved since the column was added
     
     def get_diet_types_list(self):
         """Get list of diet types for this recipe"""
-        if not self.diet_types:
-            return []
-        return [diet.strip() for diet in self.diet_types.split(',') if diet.strip()]
+        return parse_diet_types(self.diet_types)
     
     def add_diet_type(self, diet_type):
         """Add a diet type to this recipe"""
@@ -59,25 +106,16 @@ class Recipe(models.Model):
         if diet_type not in current_types:
             current_types.append(diet_type)
             self.diet_types = ', '.join(current_types)
+        self.diet_mask = diet_mask_for(current_types)
     
     def is_diet_compatible(self, diet_type):
         """Check if recipe is compatible with a specific diet type"""
-        return diet_type in self.get_diet_types_list()
+        return bool(diet_bit(diet_type) & diet_mask_for(self.get_diet_types_list()))
     
     @classmethod
     def get_available_diet_types(cls):
         """Get all available diet types"""
-        return [
-            'Balanced',
-            'Ketogenic (Keto)', 
-            'Paleo',
-            'Vegetarian',
-            'Vegan',
-            'Mediterranean',
-            'Low Carb',
-            'High Protein',
-            'Gluten Free'
-        ]
+        return list(DIET_TYPES)
     
     def get_image_url(self):
         """Get image URL safely, returns None if no image"""
@@ -94,4 +132,74 @@ class Recipe(models.Model):
         return self.get_image_url() is not None
     
     def __str__(self):
-        return self.recipe_name
\ No newline at end of file
+        return self.recipe_name
+
+
+class Ingredient(models.Model):
+    """A normalized ingredient name shared by every recipe that uses it"""
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    """Inverted index row linking a recipe to one of its ingredients"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_links')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='recipe_links')
+
+    class Meta:
+        unique_together = ['recipe', 'ingredient']
+        indexes = [
+            # "recipes containing X" walks from the ingredient side
+            models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipe_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} - {self.ingredient_id}"
+
+class SimilarRecipe(models.Model):
+    """Precomputed nearest neighbours of a recipe, rebuilt by build_similar_recipes"""
+    # No separate index: the (recipe, rank) constraint below leads with recipe
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar_links', db_index=False)
+    similar = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # Same for every row of a build; the detail page ETag follows it
+    built_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # Also the index the detail page reads its neighbours through
+            models.UniqueConstraint(fields=['recipe', 'rank'], name='similar_recipe_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id}"
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after the table, used for table-wide MATCH"""
+
+
+@SearchDocumentField.register_lookup
+class FullTextMatch(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class RecipeSearchIndex(models.Model):
+    """Read-only mapping of the recipes_recipe_fts FTS5 table (see recipes.search)"""
+    recipe = models.OneToOneField(
+        Recipe, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry'
+    )
+    document = SearchDocumentField(db_column='recipes_recipe_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'recipes_recipe_fts'
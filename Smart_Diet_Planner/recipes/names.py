@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from .catalog import CatalogIndex
+from .models import Recipe
+
+# Minimum trigram similarity for a fuzzy name match to be accepted
+FUZZY_THRESHOLD = 0.5
+
+
+def normalize_name(name):
+    """Collapse case, accents, punctuation and simple plurals ("Pancakes!" -> "pancake")"""
+    name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    name = re.sub(r'[^\w\s]', ' ', name.replace('&', ' and '))
+    words = []
+    for word in name.split():
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return ' '.join(words)
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class RecipeNameIndex:
+    """Normalized recipe name -> id, with a trigram index for near misses"""
+    exact: dict = field(default_factory=dict)
+    grams: dict = field(default_factory=dict)
+
+    def resolve(self, name):
+        """Recipe id for a name as written by a person or an LLM, None if nothing is close"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self.exact:
+            return self.exact[key]
+
+        query = trigrams(key)
+        hits = Counter()
+        for gram in query:
+            hits.update(self.grams.get(gram, ()))
+        best, best_score = None, FUZZY_THRESHOLD
+        for candidate, shared in hits.most_common(20):
+            score = shared / (len(query) + len(trigrams(candidate)) - shared)
+            if score > best_score:
+                best, best_score = candidate, score
+        return self.exact[best] if best is not None else None
+
+
+def build_name_index(version):
+    exact = {}
+    grams = defaultdict(list)
+    for recipe_id, name in Recipe.objects.order_by('id').values_list('id', 'recipe_name').iterator():
+        key = normalize_name(name)
+        if not key or key in exact:
+            continue  # first (lowest id) recipe wins for duplicate names
+        exact[key] = recipe_id
+        for gram in trigrams(key):
+            grams[gram].append(key)
+    return RecipeNameIndex(exact=exact, grams=dict(grams))
+
+
+name_index = CatalogIndex(build_name_index)
+
+
+def resolve_recipe_name(name):
+    """Recipe id for ``name`` from the in-memory name index"""
+    return name_index.get().resolve(name)
+
+
+def link_plan_recipes(meal_plan):
+    """Add a recipe_id to every meal of a generated plan whose name resolves"""
+    if not isinstance(meal_plan, dict):
+        return meal_plan
+    for day in meal_plan.values():
+        meals = day.get('meals', {}) if isinstance(day, dict) else {}
+        for meal in meals.values():
+            if isinstance(meal, dict) and meal.get('recipe_name'):
+                meal['recipe_id'] = resolve_recipe_name(meal['recipe_name'])
+    return meal_plan
@@ -0,0 +1,54 @@
+# Nutrients that can be range-filtered with ?min_<name>= / ?max_<name>=
+NUTRIENTS = ('calories', 'protein', 'carbohydrate', 'fat', 'fiber', 'sodium')
+
+# ?sort= options: label and keyset ordering. Every ordering is backed by a
+# (column, id) index on Recipe and runs in one direction only, so the index
+# can be walked forwards or backwards.
+SORT_OPTIONS = {
+    'name': ('Name', ('recipe_name', 'id')),
+    'calories': ('Fewest calories', ('calories', 'id')),
+    '-protein': ('Most protein', ('-protein', '-id')),
+    '-protein_per_calorie': ('Protein density', ('-protein_per_calorie', '-id')),
+    'carbohydrate': ('Fewest carbs', ('carbohydrate', 'id')),
+    'fat': ('Least fat', ('fat', 'id')),
+    '-fiber': ('Most fiber', ('-fiber', '-id')),
+    'sodium': ('Least sodium', ('sodium', 'id')),
+}
+
+
+def protein_density(protein, calories):
+    """Grams of protein per kcal, None when it cannot be worked out"""
+    if protein is None or not calories or calories <= 0:
+        return None
+    return protein / calories
+
+
+def parse_ranges(params, ignore_invalid=False):
+    """Lookup kwargs such as {'calories__lte': 400.0} from min_/max_ query parameters"""
+    ranges = {}
+    for nutrient in NUTRIENTS:
+        for prefix, lookup in (('min', 'gte'), ('max', 'lte')):
+            name = f'{prefix}_{nutrient}'
+            value = params.get(name)
+            if value in (None, ''):
+                continue
+            try:
+                ranges[f'{nutrient}__{lookup}'] = float(value)
+            except ValueError:
+                if not ignore_invalid:
+                    raise ValueError(f'{name} must be a number')
+    return ranges
+
+
+def sort_ordering(sort):
+    """Keyset ordering for a ?sort= value, None if it is not a known option"""
+    option = SORT_OPTIONS.get(sort)
+    return option[1] if option else None
+
+
+def apply_sort(queryset, ordering):
+    """Drop rows without a value for the sort column; keyset cursors cannot compare NULLs"""
+    column = ordering[0].lstrip('-')
+    if column in ('recipe_name', 'id'):
+        return queryset
+    return queryset.filter(**{f'{column}__isnull': False})
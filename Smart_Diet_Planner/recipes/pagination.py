@@ -0,0 +1,80 @@
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque URL-safe token"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor made by encode_cursor, returns None if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _column(name):
+    return name.lstrip('-')
+
+
+def _after(ordering, values):
+    """Q for rows strictly after ``values`` in ``ordering``.
+
+    For ('recipe_name', 'id') this builds
+    recipe_name > a OR (recipe_name = a AND id > b), which the database can
+    answer by seeking into a (recipe_name, id) index instead of skipping
+    OFFSET rows. Descending columns ('-protein') compare with < instead.
+    """
+    condition = Q()
+    for i, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        step = Q(**{f'{_column(name)}__{lookup}': values[i]})
+        for prev_name, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{_column(prev_name): prev_value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=24):
+    """Return one page of ``queryset`` ordered by ``ordering``, starting after ``cursor``.
+
+    ``ordering`` must end with a unique column (normally id), and its sort
+    key columns must not be NULL.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor, len(ordering))
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+
+    items = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        if isinstance(last, dict):  # a .values() queryset
+            next_cursor = encode_cursor(last[_column(name)] for name in ordering)
+        else:
+            next_cursor = encode_cursor(getattr(last, _column(name)) for name in ordering)
+    return KeysetPage(items=items, next_cursor=next_cursor)
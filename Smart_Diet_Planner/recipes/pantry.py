@@ -0,0 +1,153 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .catalog import CatalogIndex
+from .ingredients import term_variants
+from .models import Ingredient, Recipe, RecipeIngredient
+
+# Ingredient names every kitchen is assumed to have
+PANTRY_STAPLES = ('salt', 'water', 'black pepper', 'ground black pepper', 'salt and pepper', 'ice')
+
+
+@dataclass
+class PantryIndex:
+    """Compressed recipe x ingredient matrix held in memory.
+
+    Recipe ``i`` uses the vocabulary positions
+    ``indices[indptr[i]:indptr[i + 1]]``. A pantry is a boolean bitset over
+    the vocabulary, so scoring every recipe is one gather plus a cumulative
+    sum, with no database access.
+    """
+    version: int
+    recipe_ids: np.ndarray
+    recipe_names: list
+    indptr: np.ndarray
+    indices: np.ndarray
+    vocabulary: list
+    words: dict = field(default_factory=dict)
+
+    @property
+    def sizes(self):
+        return np.diff(self.indptr)
+
+    def resolve(self, term):
+        """Vocabulary positions whose name contains ``term`` (or a variant) as whole words"""
+        positions = set()
+        for variant in term_variants(term):
+            first = variant.split(' ', 1)[0]
+            for position in self.words.get(first, ()):
+                if f' {variant} ' in f' {self.vocabulary[position]} ':
+                    positions.add(position)
+        return positions
+
+    def pantry_bitset(self, terms):
+        bitset = np.zeros(len(self.vocabulary), dtype=bool)
+        for term in terms:
+            bitset[list(self.resolve(term))] = True
+        return bitset
+
+    def _matches(self, bitset):
+        """Number of each recipe's ingredients that are set in ``bitset``"""
+        counts = np.zeros(len(self.indices) + 1, dtype=np.int32)
+        np.cumsum(bitset[self.indices], out=counts[1:])
+        return counts[self.indptr[1:]] - counts[self.indptr[:-1]]
+
+    def match(self, terms, limit=20, include_staples=True, max_missing=None):
+        """Recipes ranked by how much of their ingredient list ``terms`` covers.
+
+        Only recipes using at least one of ``terms`` are returned. Staples
+        count towards coverage but never make a recipe match on their own.
+        """
+        have = self.pantry_bitset(terms)
+        matched = self._matches(have)
+        owned, covered = have, matched
+        if include_staples:
+            staples = self.pantry_bitset(PANTRY_STAPLES) & ~have
+            owned, covered = have | staples, matched + self._matches(staples)
+
+        sizes = self.sizes
+        missing = sizes - covered
+        candidates = matched > 0
+        if max_missing is not None:
+            candidates &= missing <= max_missing
+        candidates = np.flatnonzero(candidates)
+        if not len(candidates):
+            return []
+
+        coverage = covered[candidates] / np.maximum(sizes[candidates], 1)
+        order = np.lexsort((
+            self.recipe_ids[candidates],
+            -covered[candidates],
+            missing[candidates],
+            -coverage,
+        ))[:limit]
+
+        results = []
+        for i in order:
+            row = candidates[i]
+            start, end = self.indptr[row], self.indptr[row + 1]
+            results.append({
+                'id': int(self.recipe_ids[row]),
+                'recipe_name': self.recipe_names[row],
+                'coverage': round(float(coverage[i]), 3),
+                'matched': int(covered[row]),
+                'missing': int(missing[row]),
+                'missing_ingredients': sorted(
+                    self.vocabulary[position] for position in self.indices[start:end] if not owned[position]
+                ),
+            })
+        return results
+
+
+def build_pantry_index(version):
+    """Load the ingredient links into a PantryIndex with three flat queries"""
+    ingredient_ids, vocabulary = [], []
+    for ingredient_id, name in Ingredient.objects.order_by('id').values_list('id', 'name').iterator():
+        ingredient_ids.append(ingredient_id)
+        vocabulary.append(name)
+    ingredient_ids = np.array(ingredient_ids, dtype=np.int64)
+
+    recipe_ids, recipe_names = [], []
+    for recipe_id, name in Recipe.objects.order_by('id').values_list('id', 'recipe_name').iterator():
+        recipe_ids.append(recipe_id)
+        recipe_names.append(name)
+    recipe_ids = np.array(recipe_ids, dtype=np.int64)
+
+    links = np.array(
+        list(RecipeIngredient.objects.order_by('recipe_id', 'ingredient_id').values_list('recipe_id', 'ingredient_id').iterator()),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    rows = np.searchsorted(recipe_ids, links[:, 0])
+    indices = np.searchsorted(ingredient_ids, links[:, 1]).astype(np.int32)
+    indptr = np.zeros(len(recipe_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(recipe_ids)), out=indptr[1:])
+
+    words = defaultdict(list)
+    for position, name in enumerate(vocabulary):
+        for word in set(name.split()):
+            words[word].append(position)
+
+    return PantryIndex(
+        version=version,
+        recipe_ids=recipe_ids,
+        recipe_names=recipe_names,
+        indptr=indptr,
+        indices=indices,
+        vocabulary=vocabulary,
+        words=dict(words),
+    )
+
+
+pantry_index = CatalogIndex(build_pantry_index)
+
+
+def get_pantry_index():
+    """The process-wide PantryIndex for the current catalog version"""
+    return pantry_index.get()
+
+
+def match_pantry(terms, limit=20, include_staples=True, max_missing=None):
+    """Rank recipes by how much of them can be cooked from ``terms``"""
+    return get_pantry_index().match(terms, limit, include_staples, max_missing)
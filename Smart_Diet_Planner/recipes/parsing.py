@@ -0,0 +1,30 @@
+import ast
+
+
+def parse_instructions(instructions):
+    """Parse stored instructions (R-style c("...") vector or Python literal) into a list of steps"""
+    try:
+        if instructions.startswith("c("):  # R-style vector
+            cleaned = instructions.replace('c(', '').rstrip(')').strip()
+            return [i.strip('" ').strip() for i in cleaned.split('",')]
+        steps = ast.literal_eval(instructions)
+        if isinstance(steps, (list, tuple)):
+            return [str(step) for step in steps]
+        return [str(steps)]
+    except Exception:
+        return [instructions] if instructions else []
+
+
+def parse_ingredients(ingredients):
+    """Parse stored ingredients (R-style c("...") vector or quoted list) into a list of names"""
+    if not ingredients:
+        return []
+    try:
+        # converting to list
+        cleaned = ingredients.strip()
+        if cleaned.startswith("c("):
+            cleaned = cleaned[2:-1]
+        items = ast.literal_eval(f"[{cleaned}]")
+        return [item.capitalize() for item in items]
+    except Exception:
+        return [ingredients]
@@ -10,14 +10,16 @@ import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", message=".*LangChainDeprecationWarning:.*")
 
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
-from langchain_community.vectorstores import FAISS
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import LLMChainExtractor
 from langchain_core.output_parsers import StrOutputParser
 from langchain.memory import ConversationBufferWindowMemory
-from .utils import get_recipes_data
+from django.conf import settings
+from .embeddings import get_embeddings
+from .index_store import SharedIndex, has_saved_index, load_vectorstore, save_vectorstore
+from .vector_index import build_vectorstore, updater
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -32,10 +34,11 @@ compressor = None
 compression_retriever = None
 memory = None  
 retriever = None 
+shared_index = None
 
 
 def init_components():
-    global vectorstore, llm, compressor, compression_retriever, memory, retriever
+    global vectorstore, llm, compressor, compression_retriever, memory, retriever, shared_index
     
     try:
         if all([vectorstore, llm, compressor, compression_retriever, memory]):
@@ -43,43 +46,26 @@ def init_components():
         
         print("Initializing components...")
 
-        # Check for API key
         api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+        embeddings = get_embeddings(api_key)
 
-        data = get_recipes_data()
-        documents = []
-        for recipe in data:
-            text = f"Recipe: {recipe['recipe_name']}\n"
-            text += f"Cuisine: {recipe['cuisine']}\n"
-            text += f"Type: {recipe['type']}\n"
-            text += f"Ingredients: {recipe['ingredients']}\n"
-            text += f"Instructions: {recipe['instructions']}\n"
-            text += f"Nutritional Information:\n"
-            text += f"- Calories: {recipe['calories']}\n"
-            text += f"- Fat: {recipe['fat']}g\n"
-            text += f"- Saturated Fat: {recipe['saturated_fat']}g\n"
-            text += f"- Cholesterol: {recipe['cholesterol']}mg\n"
-            text += f"- Sodium: {recipe['sodium']}mg\n"
-            text += f"- Carbohydrate: {recipe['carbohydrate']}g\n"
-            text += f"- Fiber: {recipe['fiber']}g\n"
-            text += f"- Sugar: {recipe['sugar']}g\n"
-            text += f"- Protein: {recipe['protein']}g\n"
-            documents.append(text)
-
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=api_key)
-
-        vectorstore_path = "faiss_index.index"
-
-        if os.path.exists(vectorstore_path):
-            vectorstore = FAISS.load_local(vectorstore_path, embeddings, allow_dangerous_deserialization=True)
-        else:
-            vectorstore = FAISS.from_texts(documents, embeddings)
-            vectorstore.save_local(vectorstore_path)
+        vectorstore_path = settings.FAISS_INDEX_PATH
+
+        # An existing index is memory-mapped; documents are only built when there is none
+        if not has_saved_index(vectorstore_path):
+            save_vectorstore(build_vectorstore(embeddings), vectorstore_path)
+        shared_index = SharedIndex(vectorstore_path, embeddings)
+        vectorstore = shared_index.get()
+        if settings.FAISS_INDEX_WRITER:
+            # This process applies recipe changes and saves new versions; others only reopen them
+            updater.attach(load_vectorstore(vectorstore_path, embeddings), vectorstore_path)
 
         retriever = vectorstore.as_retriever()
 
+        # Check for API key (the chat model needs one whatever the embedding backend)
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+
         llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", api_key=api_key)
         compressor = LLMChainExtractor.from_llm(llm)
         compression_retriever = ContextualCompressionRetriever(base_compressor=compressor, base_retriever=retriever)
@@ -158,7 +144,8 @@ Context: {context}"""
         recent_history = memory.load_memory_variables({})["recent_history"]
         
         # Retrieve relevant documents
-        docs = retriever.invoke(query)
+        # The latest saved version, so changes saved by the index writer show up
+        docs = shared_index.get().as_retriever().invoke(query)
         doc_content = "\n".join([doc.page_content for doc in docs])
         context = f"{recent_history}\n{doc_content}"
         
@@ -0,0 +1,104 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import Recipe, RecipeSearchIndex
+
+# The FTS5 table is created by migration 0005, which also stores its rank
+# function: bm25 weighted so a hit in the recipe name counts far more than
+# one buried in the ingredient list.
+FTS_TABLE = RecipeSearchIndex._meta.db_table
+FTS_COLUMNS = ('recipe_name', 'ingredients', 'type', 'cuisine')
+
+
+def search_available():
+    """FTS5 is only used on SQLite; other backends fall back to icontains"""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    terms = re.findall(r'\w+', (text or '').lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _document_values(recipe):
+    return (
+        recipe.recipe_name or '',
+        ' '.join(recipe.get_ingredients_list()),
+        recipe.type or '',
+        recipe.cuisine or '',
+    )
+
+
+def index_recipe(recipe):
+    """Insert or refresh one recipe in the full-text index"""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [recipe.pk, *_document_values(recipe)],
+        )
+
+
+def index_recipes(recipes):
+    """index_recipe for a batch, with one executemany per statement"""
+    if not search_available() or not recipes:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[recipe.pk] for recipe in recipes])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [[recipe.pk, *_document_values(recipe)] for recipe in recipes],
+        )
+
+
+def remove_recipe(recipe_id):
+    """Drop one recipe from the full-text index"""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe_id])
+
+
+def rebuild_search_index(batch_size=1000):
+    """Re-create the full-text index from the Recipe table, returns the row count"""
+    if not search_available():
+        return 0
+    insert_sql = f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)"
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        rows = []
+        recipes = Recipe.objects.only('id', 'recipe_name', 'ingredients', 'ingredients_list', 'type', 'cuisine')
+        for recipe in recipes.iterator(chunk_size=batch_size):
+            rows.append([recipe.pk, *_document_values(recipe)])
+            if len(rows) >= batch_size:
+                cursor.executemany(insert_sql, rows)
+                count += len(rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert_sql, rows)
+            count += len(rows)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def search_recipes(queryset, text):
+    """Filter a Recipe queryset by free text, best BM25 matches first"""
+    if not search_available():
+        return queryset.filter(
+            Q(recipe_name__icontains=text) |
+            Q(ingredients__icontains=text) |
+            Q(type__icontains=text)
+        ).order_by('recipe_name')
+
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    return queryset.filter(search_entry__document__match=match).annotate(
+        search_rank=F('search_entry__rank')
+    ).order_by('search_rank', 'id')
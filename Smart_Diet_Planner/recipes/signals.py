@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ingredients import sync_recipe_ingredients
+from .models import Recipe
+from .search import index_recipe, remove_recipe
+from .thumbnails import schedule_thumbnail_cleanup, schedule_thumbnails, thumbnails_stale
+from .vector_index import updater
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Keep derived recipe data in step with a created or updated recipe"""
+    if thumbnails_stale(instance):
+        schedule_thumbnails(instance)
+    index_recipe(instance)
+    sync_recipe_ingredients(instance)
+    transaction.on_commit(lambda: updater.enqueue(upserts=[instance.pk]))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Drop derived recipe data for a removed recipe"""
+    schedule_thumbnail_cleanup(instance)
+    remove_recipe(instance.pk)
+    recipe_id = instance.pk  # cleared on the instance once the delete finishes
+    transaction.on_commit(lambda: updater.enqueue(deletes=[recipe_id]))
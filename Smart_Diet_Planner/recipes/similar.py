@@ -0,0 +1,152 @@
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Recipe, RecipeIngredient, SimilarRecipe
+
+SIMILAR_COUNT = 6
+MACRO_FIELDS = ('calories', 'protein', 'carbohydrate', 'fat', 'fiber', 'sodium')
+# Relative weight of each block of the feature vector
+MACRO_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+INGREDIENT_WEIGHT = 1.5
+# Ingredient columns kept, most common first. Ingredients used by a single
+# recipe are always dropped: they cannot make two recipes alike.
+MAX_INGREDIENT_TERMS = 256
+# Upper bound on the similarity block held in memory (float32 cells)
+BLOCK_CELLS = 2 ** 25
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _macro_block(rows):
+    """log-scaled, standardized nutrition columns; a missing value counts as the column mean"""
+    macros = np.log1p(np.clip(np.array(rows, dtype=np.float64).reshape(len(rows), len(MACRO_FIELDS)), 0, None))
+    present = ~np.isnan(macros)
+    counts = np.maximum(present.sum(axis=0), 1)
+    mean = np.where(present, macros, 0).sum(axis=0) / counts
+    centered = np.where(present, macros - mean, 0)
+    std = np.sqrt((centered ** 2).sum(axis=0) / counts)
+    return np.divide(centered, std, out=np.zeros_like(centered), where=std > 0) / np.sqrt(len(MACRO_FIELDS))
+
+
+def _one_hot(values):
+    """One column per distinct non-empty value"""
+    keys = [(value or '').strip().lower() for value in values]
+    vocabulary = {key: i for i, key in enumerate(sorted(set(keys) - {''}))}
+    block = np.zeros((len(keys), len(vocabulary)), dtype=np.float32)
+    for i, key in enumerate(keys):
+        if key:
+            block[i, vocabulary[key]] = 1
+    return block
+
+
+def _ingredient_block(ids):
+    """TF-IDF over the shared ingredient vocabulary, L2-normalized per recipe (``ids`` sorted)"""
+    links = np.array(
+        list(RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id').iterator()), dtype=np.int64
+    ).reshape(-1, 2)
+    links = links[np.isin(links[:, 0], ids)]
+    ingredient_ids, columns, df = np.unique(links[:, 1], return_inverse=True, return_counts=True)
+    keep = np.flatnonzero(df >= 2)
+    keep = keep[np.argsort(-df[keep], kind='stable')][:MAX_INGREDIENT_TERMS]
+    column_of = np.full(len(ingredient_ids), -1)
+    column_of[keep] = np.arange(len(keep))
+
+    block = np.zeros((len(ids), len(keep)), dtype=np.float32)
+    idf = np.log(len(ids) / df[keep]) + 1
+    rows = np.searchsorted(ids, links[:, 0])
+    cols = column_of[columns]
+    kept = cols >= 0
+    block[rows[kept], cols[kept]] = idf[cols[kept]]
+    return _normalize_rows(block)
+
+
+def build_features():
+    """(recipe ids, unit-length float32 feature matrix) for the whole catalog"""
+    rows = list(Recipe.objects.order_by('id').values_list('id', 'type', 'cuisine', *MACRO_FIELDS))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    blocks = [
+        (_macro_block([row[3:] for row in rows]), MACRO_WEIGHT),
+        (_one_hot([row[1] for row in rows]), CATEGORY_WEIGHT / 2),
+        (_one_hot([row[2] for row in rows]), CATEGORY_WEIGHT / 2),
+        (_ingredient_block(ids), INGREDIENT_WEIGHT),
+    ]
+    features = np.empty((len(ids), sum(block.shape[1] for block, _ in blocks)), dtype=np.float32)
+    column = 0
+    for block, weight in blocks:
+        features[:, column:column + block.shape[1]] = block * np.sqrt(weight)
+        column += block.shape[1]
+    del blocks
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    np.divide(features, norms, out=features, where=norms > 0)
+    return ids, features
+
+
+def nearest_neighbors(features, k=SIMILAR_COUNT, block_size=None):
+    """Yield (row, neighbour rows, cosine scores) with the k best per row, best first.
+
+    Similarities are computed a block of rows at a time, so memory stays
+    at block_size x n however large the catalog gets.
+    """
+    n = len(features)
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    block_size = block_size or max(1, BLOCK_CELLS // n)
+    for start in range(0, n, block_size):
+        scores = features[start:start + block_size] @ features.T
+        rows = np.arange(len(scores))
+        scores[rows, start + rows] = -np.inf  # a recipe is not its own neighbour
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        for i in rows:
+            yield start + i, top[i], top_scores[i]
+
+
+def build_similar_recipes(k=SIMILAR_COUNT, block_size=None, batch_size=5000):
+    """Replace the SimilarRecipe table with fresh neighbours, returns the rows written
+
+    Every row gets the same built_at, committed with the rows themselves, so
+    each process sees a rebuild as soon as it is visible.
+    """
+    ids, features = build_features()
+    ids = ids.tolist()
+    insert_sql = (
+        f'INSERT INTO {SimilarRecipe._meta.db_table} (recipe_id, similar_id, rank, score, built_at) '
+        'VALUES (%s, %s, %s, %s, %s)'
+    )
+    built_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    count = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        SimilarRecipe.objects.all().delete()
+        batch = []
+        for row, neighbours, scores in nearest_neighbors(features, k, block_size):
+            batch.extend(
+                (ids[row], ids[other], rank, float(score), built_at)
+                for rank, (other, score) in enumerate(zip(neighbours, scores)) if score > 0
+            )
+            if len(batch) >= batch_size:
+                cursor.executemany(insert_sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert_sql, batch)
+            count += len(batch)
+    return count
+
+
+def similar_recipes(recipe_id):
+    """Stored neighbours of a recipe, best first, in one query on the (recipe, rank) index"""
+    links = (
+        SimilarRecipe.objects.filter(recipe_id=recipe_id)
+        .select_related('similar')
+        .only('rank', 'similar__recipe_name', 'similar__calories')
+        .order_by('rank')
+    )
+    return [link.similar for link in links]
@@ -13,6 +13,7 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 import google.generativeai as genai
 from recipes.models import Recipe
+from recipes.names import link_plan_recipes, resolve_recipe_name
 from django.conf import settings
 
 class SimpleMealPlanGenerator:
@@ -27,30 +28,32 @@ class SimpleMealPlanGenerator:
             
             # Filter by diet preference if specified
             if diet_preference and diet_preference != 'Any':
-                recipes = recipes.filter(diet_types__icontains=diet_preference)
+                recipes = recipes.with_diet(diet_preference)
             
-            recipes_data = []
-            for recipe in recipes:
-                recipes_data.append({
-                    'recipe_name': recipe.recipe_name,
-                    'type': recipe.type,
-                    'cuisine': recipe.cuisine,
-                    'ingredients': recipe.ingredients,
-                    'instructions': recipe.instructions,
-                    'calories': recipe.calories,
-                    'protein': recipe.protein,
-                    'carbohydrate': recipe.carbohydrate,
-                    'fat': recipe.fat,
-                    'fiber': recipe.fiber,
-                    'sodium': recipe.sodium,
-                    'diet_types': recipe.diet_types,
-                    'prep_time': str(recipe.prep_time) if recipe.prep_time else 'N/A',
-                    'cook_time': str(recipe.cook_time) if recipe.cook_time else 'N/A',
-                })
-            return recipes_data
+            return [self._recipe_dict(recipe) for recipe in recipes]
         except Exception as e:
             print(f"Error getting recipes data: {e}")
             return []
+
+    def _recipe_dict(self, recipe):
+        """Plain dict of the recipe fields the planner and its JSON endpoint use"""
+        return {
+            'id': recipe.id,
+            'recipe_name': recipe.recipe_name,
+            'type': recipe.type,
+            'cuisine': recipe.cuisine,
+            'ingredients': recipe.ingredients,
+            'instructions': recipe.instructions,
+            'calories': recipe.calories,
+            'protein': recipe.protein,
+            'carbohydrate': recipe.carbohydrate,
+            'fat': recipe.fat,
+            'fiber': recipe.fiber,
+            'sodium': recipe.sodium,
+            'diet_types': recipe.diet_types,
+            'prep_time': str(recipe.prep_time) if recipe.prep_time else 'N/A',
+            'cook_time': str(recipe.cook_time) if recipe.cook_time else 'N/A',
+        }
     
     def initialize(self):
         """Initialize the AI model and recipe data"""
@@ -400,14 +403,12 @@ Generate the meal plan now:"""
             }
 
     def get_recipe_details(self, recipe_name):
-        """Get detailed recipe information by name"""
-        if not self.recipes_data:
-            self.recipes_data = self.get_recipes_data()
-        
-        for recipe in self.recipes_data:
-            if recipe['recipe_name'].lower() == recipe_name.lower():
-                return recipe
-        return None
+        """Get detailed recipe information by name (tolerates case, punctuation and plural slips)"""
+        recipe_id = resolve_recipe_name(recipe_name)
+        if recipe_id is None:
+            return None
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        return self._recipe_dict(recipe) if recipe else None
 
 # Create a global instance
 simple_meal_plan_generator = SimpleMealPlanGenerator()
@@ -422,7 +423,10 @@ def generate_simple_meal_plan(user_preferences):
     Returns:
         dict: Generated meal plan or error message
     """
-    return simple_meal_plan_generator.generate_meal_plan(user_preferences)
+    result = simple_meal_plan_generator.generate_meal_plan(user_preferences)
+    if result.get('meal_plan'):
+        link_plan_recipes(result['meal_plan'])
+    return result
 
 def get_simple_recipe_by_name(recipe_name):
     """Get recipe details by name"""
@@ -0,0 +1,62 @@
+// Infinite scroll for the recipe grid: fetches the next keyset page of
+// rendered cards from the recipes_page endpoint and appends them.
+document.addEventListener('DOMContentLoaded', function () {
+    const button = document.getElementById('load-more-recipes');
+    const grid = document.getElementById('recipe-grid');
+    if (!button || !grid) {
+        return;
+    }
+
+    let loading = false;
+
+    function loadMore() {
+        if (loading || !button.dataset.cursor) {
+            return;
+        }
+        loading = true;
+        button.disabled = true;
+
+        // Nutrition filters and sort arrive pre-encoded in data-filters
+        const params = new URLSearchParams(button.dataset.filters || '');
+        params.set('diet', button.dataset.diet);
+        params.set('search', button.dataset.search);
+        params.set('cursor', button.dataset.cursor);
+
+        fetch(button.dataset.url + '?' + params.toString(), {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                grid.insertAdjacentHTML('beforeend', data.html);
+                if (data.has_next) {
+                    button.dataset.cursor = data.next_cursor;
+                    button.disabled = false;
+                } else {
+                    button.dataset.cursor = '';
+                    button.parentElement.remove();
+                    if (observer) {
+                        observer.disconnect();
+                    }
+                }
+            })
+            .catch(function (error) {
+                console.error('Error loading recipes:', error);
+                button.disabled = false;
+            })
+            .finally(function () {
+                loading = false;
+            });
+    }
+
+    button.addEventListener('click', loadMore);
+
+    let observer = null;
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(function (entries) {
+            if (entries.some(function (entry) { return entry.isIntersecting; })) {
+                loadMore();
+            }
+        }, { rootMargin: '400px' });
+        observer.observe(button);
+    }
+});
@@ -0,0 +1,93 @@
+// Typeahead for RecipeAutocompleteWidget: queries the recipe_autocomplete
+// endpoint as the user types and stores the chosen recipe id (and its
+// nutrition, as data attributes) on the hidden input, then fires "change".
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.recipe-autocomplete').forEach(function (container) {
+        const input = container.querySelector('.recipe-autocomplete-input');
+        const hidden = container.querySelector('input[type="hidden"]');
+        const list = container.querySelector('.recipe-autocomplete-suggestions');
+        let timer = null;
+        let request = 0;
+
+        function close() {
+            list.innerHTML = '';
+            input.setAttribute('aria-expanded', 'false');
+        }
+
+        function choose(recipe) {
+            hidden.value = recipe.id;
+            hidden.dataset.name = recipe.recipe_name;
+            ['calories', 'protein', 'carbohydrate', 'fat'].forEach(function (key) {
+                hidden.dataset[key] = recipe[key] || 0;
+            });
+            input.value = recipe.recipe_name;
+            close();
+            hidden.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+
+        function render(recipes) {
+            list.innerHTML = '';
+            recipes.forEach(function (recipe) {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'list-group-item list-group-item-action';
+                item.setAttribute('role', 'option');
+                item.textContent = recipe.recipe_name;
+                if (recipe.calories) {
+                    const calories = document.createElement('small');
+                    calories.className = 'text-muted ms-2';
+                    calories.textContent = Math.round(recipe.calories) + ' kcal';
+                    item.appendChild(calories);
+                }
+                item.addEventListener('click', function () { choose(recipe); });
+                list.appendChild(item);
+            });
+            input.setAttribute('aria-expanded', recipes.length ? 'true' : 'false');
+        }
+
+        function lookup() {
+            const query = input.value.trim();
+            if (!query) {
+                close();
+                return;
+            }
+            const current = ++request;
+            const url = container.dataset.url + (container.dataset.url.indexOf('?') === -1 ? '?' : '&') +
+                new URLSearchParams({ q: query }).toString();
+            fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (current === request) {
+                        render(data.recipes);
+                    }
+                })
+                .catch(function (error) {
+                    console.error('Error loading recipe suggestions:', error);
+                });
+        }
+
+        input.addEventListener('input', function () {
+            if (hidden.value) {
+                hidden.value = '';
+                hidden.dispatchEvent(new Event('change', { bubbles: true }));
+            }
+            clearTimeout(timer);
+            timer = setTimeout(lookup, 120);
+        });
+
+        input.addEventListener('keydown', function (event) {
+            if (event.key === 'Escape') {
+                close();
+            } else if (event.key === 'Enter' && list.firstChild) {
+                event.preventDefault();
+                list.firstChild.click();
+            }
+        });
+
+        document.addEventListener('click', function (event) {
+            if (!container.contains(event.target)) {
+                close();
+            }
+        });
+    });
+});
@@ -1,8 +1,16 @@
 from django import template
 
+from recipes.thumbnails import srcset
+
 register = template.Library()
 
 @register.filter
 def get_item(dictionary, key):
     """Get an item from a dictionary in templates"""
-    return dictionary.get(key, 0)
\ No newline at end of file
+    return dictionary.get(key, 0)
+
+
+@register.simple_tag
+def recipe_srcset(recipe, fmt='webp'):
+    """srcset of the generated thumbnails of a recipe image ('webp' or 'jpeg')"""
+    return srcset(recipe, fmt)
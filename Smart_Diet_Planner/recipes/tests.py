@@ -1,3 +1,1071 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from langchain_core.embeddings import Embeddings
+import numpy as np
+from PIL import Image
+
+from .autocomplete import suggest
+from .categorize import KeywordMatcher, classify
+from .diets import canonical_diet, diet_bit
+from .embeddings import CachedEmbeddings, EmbeddingCache, HashingEmbeddings, get_embeddings
+from .facets import get_diet_facets
+from .fetching import Checkpoint, ImageFetcher, TokenBucket
+from .importing import parse_duration_value
+from .index_store import DocumentFile, SharedIndex, current_version, load_vectorstore, save_vectorstore
+from .ingredients import parse_ingredient_query, recipes_with_ingredients
+from .models import Recipe, SimilarRecipe
+from .names import link_plan_recipes, normalize_name, resolve_recipe_name
+from .nutrition import sort_ordering
+from .pagination import keyset_page
+from .management.commands.categorize_recipes import Command as CategorizeCommand
+from .pantry import get_pantry_index, match_pantry
+from .search import build_match_query, rebuild_search_index, search_recipes
+from .similar import build_features, build_similar_recipes, nearest_neighbors, similar_recipes
+from .thumbnails import refresh_thumbnails, srcset, thumbnail_name, thumbnails_stale, variant_names
+from .vector_index import IndexUpdater, build_vectorstore
+
+
+class DietMaskTests(TestCase):
+    def test_aliases_resolve_to_canonical_diet(self):
+        self.assertEqual(canonical_diet('Ketogenic'), 'Ketogenic (Keto)')
+        self.assertEqual(canonical_diet('keto'), 'Ketogenic (Keto)')
+        self.assertEqual(canonical_diet('low-carb'), 'Low Carb')
+        self.assertIsNone(canonical_diet('Carnivore'))
+
+    def test_save_keeps_mask_in_sync(self):
+        recipe = Recipe.objects.create(recipe_name='Salmon', diet_types='Ketogenic, Low Carb')
+        self.assertEqual(recipe.diet_mask, diet_bit('Ketogenic (Keto)') | diet_bit('Low Carb'))
+
+        recipe.add_diet_type('Paleo')
+        recipe.save(update_fields=['diet_types'])
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.diet_mask & diet_bit('Paleo'))
+
+    def test_with_diet_matches_whole_diet_names(self):
+        keto = Recipe.objects.create(recipe_name='Fat Bomb', diet_types='Ketogenic (Keto)')
+        Recipe.objects.create(recipe_name='Rice Bowl', diet_types='Balanced, Gluten Free')
+
+        self.assertEqual(list(Recipe.objects.with_diet('Ketogenic')), [keto])
+        self.assertEqual(list(Recipe.objects.with_diet('Ketogenic (Keto)')), [keto])
+        self.assertFalse(Recipe.objects.with_diet('Unknown').exists())
+
+
+class DietFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_come_from_one_cached_query(self):
+        Recipe.objects.create(recipe_name='Fat Bomb', diet_types='Ketogenic, Low Carb')
+        Recipe.objects.create(recipe_name='Rice Bowl', diet_types='Balanced')
+
+        with self.assertNumQueries(2):
+            diet_counts, total = get_diet_facets()
+        with self.assertNumQueries(1):  # only the catalog version
+            get_diet_facets()
+
+        self.assertEqual(total, 2)
+        self.assertEqual(diet_counts['Ketogenic (Keto)'], 1)
+        self.assertEqual(diet_counts['Vegan'], 0)
+
+    def test_recipe_writes_invalidate_counts(self):
+        recipe = Recipe.objects.create(recipe_name='Lentil Curry', diet_types='Vegan')
+        self.assertEqual(get_diet_facets()[0]['Vegan'], 1)
+
+        recipe.delete()
+        self.assertEqual(get_diet_facets(), ({diet: 0 for diet in Recipe.get_available_diet_types()}, 0))
+
+    def test_counts_follow_writes_that_skip_signals(self):
+        recipe = Recipe.objects.create(recipe_name='Lentil Curry', diet_types='Vegan')
+        self.assertEqual(get_diet_facets()[0]['Vegan'], 1)
+
+        # A bulk command in another process: nothing invalidates this cache
+        Recipe.objects.filter(pk=recipe.pk).update(
+            diet_types='Paleo', diet_mask=diet_bit('Paleo'), updated_at=timezone.now()
+        )
+        diet_counts, _ = get_diet_facets()
+        self.assertEqual((diet_counts['Vegan'], diet_counts['Paleo']), (0, 1))
+
+
+class RecipeSearchTests(TestCase):
+    def test_match_query_uses_prefix_terms(self):
+        self.assertEqual(build_match_query('Chick  spin!'), '"chick"* "spin"*')
+        self.assertEqual(build_match_query('"; DROP'), '"drop"*')
+
+    def test_results_are_ranked_and_kept_in_sync(self):
+        salad = Recipe.objects.create(recipe_name='Chicken Salad', ingredients='c("chicken", "lettuce")')
+        soup = Recipe.objects.create(recipe_name='Vegetable Soup', ingredients='c("carrot", "chicken stock")')
+        Recipe.objects.create(recipe_name='Fruit Bowl', ingredients='c("apple")')
+
+        self.assertEqual(list(search_recipes(Recipe.objects.all(), 'chick')), [salad, soup])
+
+        soup.delete()
+        salad.recipe_name = 'Green Salad'
+        salad.save()
+        self.assertEqual(list(search_recipes(Recipe.objects.all(), 'green')), [salad])
+        self.assertEqual(list(search_recipes(Recipe.objects.all(), 'soup')), [])
+
+    def test_rebuild_reindexes_every_recipe(self):
+        Recipe.objects.create(recipe_name='Lentil Curry')
+        Recipe.objects.bulk_create([Recipe(recipe_name='Lentil Soup')])
+
+        self.assertEqual(rebuild_search_index(), 2)
+        self.assertEqual(search_recipes(Recipe.objects.all(), 'lentil').count(), 2)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Duplicate names make sure the id tie-breaker is honoured
+        for name in ['Curry', 'Apple Pie', 'Bagel', 'Bagel', 'Dal', 'Eggs']:
+            Recipe.objects.create(recipe_name=name, diet_types='Vegetarian')
+
+    def test_pages_walk_the_whole_ordering_once(self):
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(Recipe.objects.all(), ('recipe_name', 'id'), cursor, per_page=4)
+            seen.extend(page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, list(Recipe.objects.order_by('recipe_name', 'id')))
+
+    def test_bad_cursor_starts_from_the_first_page(self):
+        page = keyset_page(Recipe.objects.all(), ('recipe_name', 'id'), 'not-a-cursor', per_page=2)
+        self.assertEqual([r.recipe_name for r in page.items], ['Apple Pie', 'Bagel'])
+
+    def test_next_page_endpoint(self):
+        url = reverse('recipes_page')
+        first = self.client.get(url, {'diet': 'Vegetarian'}).json()
+        self.assertEqual(first['count'], 6)
+        self.assertFalse(first['has_next'])
+        self.assertIn('Apple Pie', first['html'])
+
+
+class ParsedListTests(TestCase):
+    def test_lists_are_parsed_on_save_and_read_back_without_parsing(self):
+        Recipe.objects.create(
+            recipe_name='Borscht',
+            ingredients='c("cabbage", "beets")',
+            instructions='c("Saute cabbage.", "Add beets.")',
+        )
+
+        with mock.patch('recipes.models.parse_ingredients') as parse_ingredients, \
+                mock.patch('recipes.models.parse_instructions') as parse_instructions:
+            recipe = Recipe.objects.get()
+            self.assertEqual(recipe.get_ingredients_list(), ['Cabbage', 'Beets'])
+            self.assertEqual(recipe.get_instructions_list(), ['Saute cabbage.', 'Add beets.'])
+        parse_ingredients.assert_not_called()
+        parse_instructions.assert_not_called()
+
+    def test_update_fields_refreshes_parsed_list(self):
+        recipe = Recipe.objects.create(recipe_name='Toast', ingredients='"bread"')
+        recipe.ingredients = '"bread", "butter"'
+        recipe.save(update_fields=['ingredients'])
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredients_list, ['Bread', 'Butter'])
+
+
+class IngredientIndexTests(TestCase):
+    def setUp(self):
+        self.salad = Recipe.objects.create(recipe_name='Chicken Salad', ingredients='c("chicken breast", "spinach")')
+        self.creamy = Recipe.objects.create(recipe_name='Creamy Chicken', ingredients='c("chicken", "spinach", "heavy cream")')
+        Recipe.objects.create(recipe_name='Spinach Soup', ingredients='c("spinach", "onions")')
+
+    def test_query_parsing(self):
+        self.assertEqual(parse_ingredient_query('chicken AND spinach NOT dairy'), (['chicken', 'spinach'], ['dairy']))
+        self.assertEqual(parse_ingredient_query('Onion, -Heavy Cream'), (['onion'], ['heavy cream']))
+
+    def test_include_and_exclude_terms(self):
+        self.assertEqual(
+            set(recipes_with_ingredients(['chicken', 'spinach'])), {self.salad, self.creamy}
+        )
+        self.assertEqual(list(recipes_with_ingredients(['chicken', 'spinach'], ['dairy'])), [self.salad])
+        self.assertEqual(recipes_with_ingredients(['onion']).get().recipe_name, 'Spinach Soup')
+        self.assertFalse(recipes_with_ingredients(['saffron']).exists())
+
+    def test_links_follow_ingredient_edits(self):
+        self.creamy.ingredients = 'c("chicken", "spinach", "olive oil")'
+        self.creamy.save()
+        self.assertEqual(
+            set(recipes_with_ingredients(['chicken'], ['dairy'])), {self.salad, self.creamy}
+        )
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('recipes_by_ingredient'), {'q': 'chicken AND spinach, NOT dairy'})
+        self.assertEqual([r['recipe_name'] for r in response.json()['results']], ['Chicken Salad'])
+        self.assertEqual(self.client.get(reverse('recipes_by_ingredient')).status_code, 400)
+
+        for term in ('dairy', 'NOT dairy', '-dairy'):
+            response = self.client.get(reverse('recipes_by_ingredient'), {'include': 'chicken', 'exclude': term})
+            self.assertEqual(response.json()['exclude'], ['dairy'])
+            self.assertEqual([r['recipe_name'] for r in response.json()['results']], ['Chicken Salad'])
+
+
+class PantryMatcherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Recipe.objects.create(recipe_name='Chicken Rice', ingredients='c("chicken breast", "rice", "salt")')
+        Recipe.objects.create(recipe_name='Chicken Curry', ingredients='c("chicken", "rice", "coconut milk", "curry paste")')
+        Recipe.objects.create(recipe_name='Salted Water', ingredients='c("salt", "water")')
+
+    def test_recipes_ranked_by_coverage(self):
+        results = match_pantry(['chicken', 'rice'])
+        self.assertEqual([r['recipe_name'] for r in results], ['Chicken Rice', 'Chicken Curry'])
+        self.assertEqual(results[0]['coverage'], 1.0)
+        self.assertEqual(results[1]['missing_ingredients'], ['coconut milk', 'curry paste'])
+
+        self.assertEqual(match_pantry(['chicken', 'rice'], max_missing=0)[0]['recipe_name'], 'Chicken Rice')
+        self.assertEqual(match_pantry(['chicken', 'rice'], include_staples=False)[0]['missing'], 1)
+        self.assertEqual(match_pantry(['saffron']), [])
+
+    def test_index_is_reused_until_the_catalog_changes(self):
+        index = get_pantry_index()
+        with self.assertNumQueries(2):  # only the catalog version, once per lookup
+            self.assertIs(get_pantry_index(), index)
+            match_pantry(['rice'])
+
+        Recipe.objects.create(recipe_name='Rice Pudding', ingredients='c("rice", "milk", "sugar")')
+        self.assertIsNot(get_pantry_index(), index)
+        self.assertEqual(len(match_pantry(['rice'])), 3)
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('pantry_matches'), {'have': 'chicken, rice', 'limit': 1})
+        self.assertEqual([r['recipe_name'] for r in response.json()['results']], ['Chicken Rice'])
+        self.assertEqual(self.client.get(reverse('pantry_matches')).status_code, 400)
+
+
+class RecipeCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def render_cards(self):
+        return render_to_string('recipes/recipe_cards.html', {'recipes': list(Recipe.objects.all())})
+
+    def test_cards_are_cached_until_the_recipe_changes(self):
+        recipe = Recipe.objects.create(recipe_name='Lentil Curry', diet_types='Vegan')
+        self.assertIn('Lentil Curry', self.render_cards())
+
+        with mock.patch.object(Recipe, 'get_diet_types_list') as get_diet_types_list:
+            self.assertIn('Lentil Curry', self.render_cards())
+        get_diet_types_list.assert_not_called()
+
+        recipe.recipe_name = 'Red Lentil Curry'
+        recipe.save()
+        self.assertIn('Red Lentil Curry', self.render_cards())
+
+    def test_writes_that_skip_signals_still_change_the_card(self):
+        recipe = Recipe.objects.create(recipe_name='Lentil Curry')
+        self.assertIn('Lentil Curry', self.render_cards())
+        Recipe.objects.filter(pk=recipe.pk).update(recipe_name='Red Lentil Curry', updated_at=timezone.now())
+        self.assertIn('Red Lentil Curry', self.render_cards())
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.recipe = Recipe.objects.create(recipe_name='Lentil Curry', diet_types='Vegan')
+
+    def test_detail_page_revalidates_until_the_recipe_changes(self):
+        url = reverse('recipe_detail', args=[self.recipe.pk])
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200)
+
+        self.recipe.recipe_name = 'Red Lentil Curry'
+        self.recipe.save(update_fields=['recipe_name'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_listing_etag_follows_filters_and_catalog(self):
+        url = reverse('recipes_by_diet')
+        etag = self.client.get(url, {'diet': 'Vegan'})['ETag']
+
+        self.assertEqual(self.client.get(url, {'diet': 'Vegan'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'diet': 'Paleo'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.recipe.delete()
+        self.assertEqual(self.client.get(url, {'diet': 'Vegan'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class RecipeAPITests(TestCase):
+    def setUp(self):
+        for i, calories in enumerate([250, 450, 650]):
+            Recipe.objects.create(recipe_name=f'Bowl {i}', calories=calories, protein=20, diet_types='Vegan' if i else 'Paleo')
+
+    def test_fields_filters_and_cursor(self):
+        url = reverse('recipes_api')
+        first = self.client.get(url, {'fields': 'recipe_name,calories', 'max_calories': 500, 'limit': 1}).json()
+        self.assertEqual(first['results'], [{'id': first['results'][0]['id'], 'recipe_name': 'Bowl 0', 'calories': 250.0}])
+        self.assertTrue(first['has_next'])
+
+        second = self.client.get(url, {'fields': 'recipe_name', 'max_calories': 500, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([r['recipe_name'] for r in second['results']], ['Bowl 1'])
+        self.assertFalse(second['has_next'])
+
+        vegan = self.client.get(url, {'diet': 'Vegan', 'min_calories': 500}).json()['results']
+        self.assertEqual([r['recipe_name'] for r in vegan], ['Bowl 2'])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get(reverse('recipes_api'), {'fields': 'password'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('recipes_api'), {'min_calories': 'lots'}).status_code, 400)
+
+    def test_ndjson_export_streams_every_row(self):
+        response = self.client.get(reverse('recipes_api'), {'format': 'ndjson', 'fields': 'recipe_name,image'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])['image'], None)
+
+
+class NutritionFilterTests(TestCase):
+    def setUp(self):
+        Recipe.objects.create(recipe_name='Steak', calories=600, protein=50)
+        Recipe.objects.create(recipe_name='Egg Whites', calories=120, protein=25)
+        Recipe.objects.create(recipe_name='Tofu Bowl', calories=380, protein=30)
+        Recipe.objects.create(recipe_name='Salad', calories=150, protein=None)
+
+    def test_protein_density_is_kept_on_save(self):
+        recipe = Recipe.objects.get(recipe_name='Egg Whites')
+        self.assertAlmostEqual(recipe.protein_per_calorie, 25 / 120)
+        recipe.calories = 100
+        recipe.save(update_fields=['calories'])
+        recipe.refresh_from_db()
+        self.assertAlmostEqual(recipe.protein_per_calorie, 0.25)
+        self.assertIsNone(Recipe.objects.get(recipe_name='Salad').protein_per_calorie)
+
+    def test_browse_ranges_and_descending_sort(self):
+        response = self.client.get(reverse('recipes_by_diet'), {'max_calories': 400, 'min_protein': 20, 'sort': '-protein_per_calorie'})
+        self.assertEqual([r.recipe_name for r in response.context['recipes']], ['Egg Whites', 'Tofu Bowl'])
+        self.assertEqual(response.context['result_count'], 2)
+
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(Recipe.objects.filter(protein__isnull=False), sort_ordering('-protein'), cursor, per_page=1)
+            seen.extend(r.recipe_name for r in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, ['Steak', 'Tofu Bowl', 'Egg Whites'])
+
+    def test_api_sort_and_ranges(self):
+        url = reverse('recipes_api')
+        first = self.client.get(url, {'fields': 'recipe_name', 'sort': '-protein', 'limit': 2}).json()
+        self.assertEqual(first['results'][1], {'id': first['results'][1]['id'], 'recipe_name': 'Tofu Bowl'})
+        rest = self.client.get(url, {'fields': 'recipe_name', 'sort': '-protein', 'cursor': first['next_cursor']}).json()
+        self.assertEqual([r['recipe_name'] for r in rest['results']], ['Egg Whites'])
+
+        self.assertEqual(self.client.get(url, {'sort': 'tastiness'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'min_fiber': 'x'}).status_code, 400)
+
+    def test_range_filters_and_sorts_use_the_indexes(self):
+        plan = Recipe.objects.filter(calories__lte=400).order_by('calories', 'id').explain()
+        self.assertIn('recipe_calories_id_idx', plan)
+
+        plan = Recipe.objects.filter(protein__gte=30).order_by('-protein', '-id').explain()
+        self.assertIn('recipe_protein_id_idx', plan)
+
+        plan = Recipe.objects.filter(protein_per_calorie__isnull=False).order_by('-protein_per_calorie', '-id').explain()
+        self.assertIn('recipe_protein_density_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class RecipeNameIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pancakes = Recipe.objects.create(recipe_name='Blueberry Pancakes')
+        self.salad = Recipe.objects.create(recipe_name='Grilled Chicken & Avocado Salad')
+
+    def test_exact_and_normalized_names(self):
+        self.assertEqual(normalize_name('  Crème Brûlée!! '), 'creme brulee')
+        self.assertEqual(resolve_recipe_name('blueberry pancake'), self.pancakes.pk)
+        self.assertEqual(resolve_recipe_name('Grilled chicken and avocado salad.'), self.salad.pk)
+
+    def test_fuzzy_fallback(self):
+        self.assertEqual(resolve_recipe_name('Grilled Chiken Avocado Salad'), self.salad.pk)
+        self.assertIsNone(resolve_recipe_name('Beef Wellington'))
+
+    def test_index_follows_catalog_changes_and_links_plans(self):
+        self.assertIsNone(resolve_recipe_name('Lentil Soup'))
+        soup = Recipe.objects.create(recipe_name='Lentil Soup')
+        self.assertEqual(resolve_recipe_name('Lentil Soup'), soup.pk)
+
+        with self.assertNumQueries(1):  # only the catalog version
+            plan = link_plan_recipes({'day_1': {'meals': {'lunch': {'recipe_name': 'lentil soups'}}}})
+        self.assertEqual(plan['day_1']['meals']['lunch']['recipe_id'], soup.pk)
+
+    def test_index_sees_writes_that_skip_signals(self):
+        # Like a bulk command in another process: no signal reaches this one
+        self.assertEqual(resolve_recipe_name('Blueberry Pancakes'), self.pancakes.pk)
+        Recipe.objects.filter(pk=self.pancakes.pk).update(recipe_name='Lemon Crepes', updated_at=timezone.now())
+        self.assertEqual(resolve_recipe_name('Lemon Crepes'), self.pancakes.pk)
+        Recipe.objects.filter(pk=self.pancakes.pk).delete()
+        self.assertIsNone(resolve_recipe_name('Lemon Crepes'))
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.salad = Recipe.objects.create(recipe_name='Grilled Chicken Salad', calories=350, ingredients='c("chicken breast", "lettuce")')
+        self.soup = Recipe.objects.create(recipe_name='Chickpea Soup', calories=None, ingredients='c("chickpeas")')
+
+    def test_prefix_matches_names_words_and_ingredients(self):
+        result = suggest('chick')
+        self.assertEqual([r['recipe_name'] for r in result['recipes']], ['Chickpea Soup', 'Grilled Chicken Salad'])
+        self.assertEqual(result['ingredients'], ['chicken breast', 'chickpeas'])
+
+        self.assertEqual([r['id'] for r in suggest('chick', nutrition_only=True)['recipes']], [self.salad.pk])
+        self.assertEqual(suggest('sal')['recipes'][0]['calories'], 350)
+        self.assertEqual(suggest('')['recipes'], [])
+
+    def test_endpoint_is_served_from_memory(self):
+        suggest('warm up')
+        with self.assertNumQueries(1):  # only the catalog version
+            response = self.client.get(reverse('recipe_autocomplete'), {'q': 'grilled', 'nutrition': '1'})
+        self.assertEqual(response.json()['recipes'][0]['id'], self.salad.pk)
+
+    def test_meal_log_form_uses_the_widget(self):
+        from FitBuddy_app.forms import MealLogForm
+
+        html = str(MealLogForm()['recipe'])
+        self.assertIn('recipe-autocomplete', html)
+        self.assertNotIn('Chickpea Soup', html)
+
+        form = MealLogForm({'recipe': self.salad.pk, 'meal_type': 'lunch', 'date_logged': '2024-01-01', 'servings': 1})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIn('data-name="Grilled Chicken Salad"', str(form['recipe']))
+
+
+class TempDirMixin:
+    """Temporary directories removed after each test, and a temporary MEDIA_ROOT"""
+
+    def make_tempdir(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+    def use_temp_media(self):
+        """Point MEDIA_ROOT at a new temporary directory, with thumbnails encoded on commit in the test thread"""
+        media = self.make_tempdir()
+        settings_override = override_settings(MEDIA_ROOT=media, THUMBNAILS_IN_BACKGROUND=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return media
+
+
+def image_upload(name='bowl.png', size=(400, 300), color=(200, 80, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ThumbnailTests(TempDirMixin, TestCase):
+    def setUp(self):
+        self.use_temp_media()
+        cache.clear()
+
+    def create(self, image=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(recipe_name='Bowl', image=image or image_upload(), **fields)
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_variants_are_generated_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = Recipe.objects.create(recipe_name='Bowl', image=image_upload())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, {})  # nothing encoded inside the save
+
+        for callback in callbacks:
+            callback()
+        recipe.refresh_from_db()
+        storage = recipe.image.storage
+        self.assertEqual(recipe.image_variants['widths'], [160, 320])
+        for width in (160, 320, 400):
+            self.assertTrue(storage.exists(thumbnail_name(recipe.image.name, width, 'webp')))
+        with storage.open(thumbnail_name(recipe.image.name, 160, 'jpg')) as f:
+            self.assertEqual(Image.open(f).size, (160, 120))
+
+        self.assertIn('-160w.webp 160w', srcset(recipe))
+        self.assertTrue(srcset(recipe, 'jpeg').endswith(f'{recipe.image.url} 400w'))
+        html = render_to_string('recipes/recipe_cards.html', {'recipes': [recipe]})
+        self.assertIn('type="image/webp"', html)
+
+    def test_placeholder_is_tiny_and_inlined(self):
+        recipe = self.create()
+        self.assertTrue(recipe.image_placeholder.startswith('data:image/webp;base64,'))
+        self.assertLess(len(recipe.image_placeholder), 300)
+
+        html = render_to_string('recipes/recipe_cards.html', {'recipes': [recipe]})
+        self.assertIn(f'url({recipe.image_placeholder})', html)
+
+    def test_old_variant_files_are_deleted(self):
+        recipe = self.create()
+        storage = recipe.image.storage
+        first = variant_names(recipe.image_variants)
+        self.assertEqual(len(first), 5)
+
+        recipe.image = image_upload('plate.png', size=(200, 100))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        recipe.refresh_from_db()
+        self.assertFalse(any(storage.exists(name) for name in first))
+        second = variant_names(recipe.image_variants)
+        self.assertTrue(second and all(storage.exists(name) for name in second))
+
+        recipe.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual((recipe.image_variants, recipe.image_placeholder), ({}, ''))
+        self.assertFalse(any(storage.exists(name) for name in second))
+
+        recipe = self.create()
+        third = variant_names(recipe.image_variants)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertFalse(any(storage.exists(name) for name in third))
+
+    def test_sources_sharing_a_base_name_keep_their_own_variants(self):
+        jpeg = self.create(image=image_upload('collide.jpg'))
+        png = self.create(image=image_upload('collide.png', size=(200, 100)))
+        storage = png.image.storage
+        self.assertFalse(set(variant_names(jpeg.image_variants)) & set(variant_names(png.image_variants)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            jpeg.delete()
+        self.assertTrue(all(storage.exists(name) for name in variant_names(png.image_variants)))
+        with storage.open(thumbnail_name(png.image.name, 160, 'jpg')) as f:
+            self.assertEqual(Image.open(f).size, (160, 80))
+
+    def test_swapping_to_the_same_base_name_keeps_the_new_variants(self):
+        recipe = self.create(image=image_upload('collide.jpg'))
+        storage = recipe.image.storage
+        old = variant_names(recipe.image_variants)
+
+        recipe.image = image_upload('collide.png', size=(200, 100))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        recipe.refresh_from_db()
+        new = variant_names(recipe.image_variants)
+        self.assertTrue(new and all(storage.exists(name) for name in new))
+        self.assertFalse(any(storage.exists(name) for name in set(old) - set(new)))
+
+        # Regenerating the same source rewrites its files and deletes none of them
+        refresh_thumbnails(recipe)
+        self.assertTrue(all(storage.exists(name) for name in new))
+
+    def test_variants_named_before_the_extension_was_kept_are_stale(self):
+        recipe = self.create()
+        storage = recipe.image.storage
+        legacy = dict(recipe.image_variants)
+        del legacy['version']
+        for name in variant_names(legacy):
+            storage.save(name, ContentFile(b'old'))
+        Recipe.objects.filter(pk=recipe.pk).update(image_variants=legacy)
+        recipe.refresh_from_db()
+        self.assertTrue(thumbnails_stale(recipe))
+        self.assertEqual(srcset(recipe), '')
+
+        refresh_thumbnails(recipe)
+        self.assertFalse(any(storage.exists(name) for name in variant_names(legacy)))
+        self.assertTrue(all(storage.exists(name) for name in variant_names(recipe.image_variants)))
+
+    def test_backfill_command_only_touches_stale_recipes(self):
+        recipe = Recipe.objects.create(recipe_name='Bowl', image=image_upload())
+
+        out = io.StringIO()
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('Generated thumbnails for 1 recipes (0 up to date', out.getvalue())
+        call_command('generate_thumbnails', stdout=out)
+        self.assertIn('Generated thumbnails for 0 recipes (1 up to date', out.getvalue())
+
+
+class ImageStandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the image APIs: 'Flaky' names fail once with a 503, 'Missing' ones 404,
+    'Throttled' ones always 429 with an hour-long Retry-After"""
+
+    def do_GET(self):
+        name = parse_qs(urlsplit(self.path).query)['q'][0]
+        with self.server.lock:
+            self.server.hits[name] += 1
+            hits = self.server.hits[name]
+        if name.startswith('Missing'):
+            self.send_response(404)
+            self.end_headers()
+        elif name.startswith('Flaky') and hits == 1:
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+        elif name.startswith('Throttled'):
+            self.send_response(429)
+            self.send_header('Retry-After', '3600')
+            self.end_headers()
+        else:
+            body = image_upload().read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageFetchTests(TempDirMixin, TestCase):
+    def setUp(self):
+        self.checkpoint = os.path.join(self.use_temp_media(), 'fetch.checkpoint')
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ImageStandInHandler)
+        self.server.hits = Counter()
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        cache.clear()
+
+    def fetch(self, *args):
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                'add_recipe_images', '--concurrency', '3', '--rate', '1000', '--checkpoint', self.checkpoint,
+                '--image-source', f'http://127.0.0.1:{self.server.server_port}/img?q={{query}}', *args, stdout=out,
+            )
+        return out.getvalue()
+
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+
+    def test_concurrent_fetch_retries_and_resumes(self):
+        names = ['Soup', 'Salad', 'Flaky Stew', 'Missing Pie']
+        for name in names:
+            Recipe.objects.create(recipe_name=name)
+
+        out = self.fetch('--retries', '1')
+        self.assertIn('Successfully added 3/4 images', out)
+        self.assertEqual(self.server.hits['Flaky Stew'], 2)
+        self.assertEqual(self.server.hits['Missing Pie'], 1)
+        stew = Recipe.objects.get(recipe_name='Flaky Stew')
+        self.assertTrue(stew.image.name.startswith('recipes/flaky_stew'))
+        self.assertTrue(stew.image_placeholder)
+        self.assertEqual(Checkpoint(self.checkpoint).load(), set(
+            Recipe.objects.exclude(recipe_name='Missing Pie').values_list('id', flat=True)
+        ))
+
+        # A forced re-run resumes: only the recipe that failed is requested again
+        out = self.fetch('--force', '--retries', '0')
+        self.assertIn('skipping 3 recipes', out)
+        self.assertEqual(self.server.hits['Missing Pie'], 2)
+        self.assertEqual(self.server.hits['Soup'], 1)
+
+    def test_long_retry_after_fails_instead_of_sleeping(self):
+        Recipe.objects.create(recipe_name='Throttled Tart')
+        started = time.monotonic()
+        out = self.fetch('--retries', '3')
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertIn('Successfully added 0/1 images', out)
+        self.assertEqual(self.server.hits['Throttled Tart'], 1)
+
+        fetcher = ImageFetcher(backoff=10, max_delay=5)
+        self.assertEqual(fetcher._delay(6), 5)
+
+
+class CategorizeTests(TestCase):
+    def test_matcher_sees_overlapping_keywords(self):
+        matcher = KeywordMatcher({'vegan': ['lentil'], 'plant_protein': ['lentils'], 'meat': ['ham']})
+        self.assertEqual(matcher.flags('red lentils with ham'), 0b111)
+        self.assertEqual(matcher.flags('lentil soup'), 0b1)
+
+    def test_classify_rules(self):
+        keto, salad, stew = classify([
+            ('Butter Coffee', None, 1, 1, 30),
+            ('Quinoa Salad', 'vegan', 8, 30, 5),
+            ('Chicken Pasta Stew', None, 5, 30, 5),
+        ])
+        self.assertEqual(keto, 'Gluten Free, Ketogenic, Low Carb, Paleo, Vegetarian')
+        self.assertEqual(salad, 'Gluten Free, Vegan, Vegetarian')
+        self.assertEqual(stew, 'Balanced')
+
+    def test_command_bulk_updates_changed_recipes(self):
+        stew = Recipe.objects.create(recipe_name='Chicken Pasta Stew', protein=5, carbohydrate=30, fat=5, diet_types='Vegan')
+        get_diet_facets()
+        out = io.StringIO()
+        call_command('categorize_recipes', '--batch-size', '2', stdout=out)
+        self.assertIn('Successfully categorized', out.getvalue())
+
+        stew.refresh_from_db()
+        self.assertEqual(stew.diet_types, 'Balanced')
+        self.assertEqual(stew.diet_mask, diet_bit('Balanced'))
+        self.assertEqual(get_diet_facets()[0]['Vegan'], Recipe.objects.with_diet('Vegan').count())
+
+        # The first run also created sample recipes for the empty diets
+        call_command('categorize_recipes', stdout=out)
+        out = io.StringIO()
+        call_command('categorize_recipes', stdout=out)
+        self.assertIn('Successfully categorized 0 recipes!', out.getvalue())
+        self.assertIn('0 reprocessed (0 updated), 9 skipped as unchanged', out.getvalue())
+
+    def test_only_changed_recipes_are_reprocessed(self):
+        stew = Recipe.objects.create(recipe_name='Chicken Pasta Stew', protein=5, carbohydrate=30, fat=5)
+        Recipe.objects.create(recipe_name='Tofu Bowl', protein=20, carbohydrate=10, fat=5)
+        with mock.patch.object(CategorizeCommand, 'check_diet_coverage'):
+            call_command('categorize_recipes', stdout=io.StringIO())
+
+            stew.recipe_name = 'Lentil Stew'
+            stew.save()
+            Recipe.objects.filter(recipe_name='Tofu Bowl').update(diet_types='Paleo')  # not an input
+            out = io.StringIO()
+            call_command('categorize_recipes', stdout=out)
+        self.assertIn('1 reprocessed (1 updated), 1 skipped as unchanged', out.getvalue())
+        stew.refresh_from_db()
+        self.assertIn('Vegan', stew.diet_types)
+        self.assertEqual(Recipe.objects.get(recipe_name='Tofu Bowl').diet_types, 'Paleo')
+
+        out = io.StringIO()
+        with mock.patch.object(CategorizeCommand, 'check_diet_coverage'):
+            call_command('categorize_recipes', '--full', stdout=out)
+        self.assertIn('2 reprocessed (1 updated), 0 skipped', out.getvalue())
+
+    def test_interrupted_run_leaves_no_hash_without_its_labels(self):
+        stew = Recipe.objects.create(recipe_name='Chicken Pasta Stew', protein=5, carbohydrate=30, fat=5, diet_types='Vegan')
+        tofu = Recipe.objects.create(recipe_name='Tofu Bowl', protein=20, carbohydrate=10, fat=5)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TRIGGER fail_tofu BEFORE UPDATE OF diet_types ON {Recipe._meta.db_table} "
+                f"WHEN NEW.recipe_name = 'Tofu Bowl' BEGIN SELECT RAISE(ABORT, 'interrupted'); END"
+            )
+        with mock.patch.object(CategorizeCommand, 'check_diet_coverage'), self.assertRaises(Exception):
+            call_command('categorize_recipes', '--batch-size', '1', stdout=io.StringIO())
+        stew.refresh_from_db()
+        tofu.refresh_from_db()
+        self.assertEqual(stew.diet_types, 'Balanced')
+        self.assertTrue(stew.category_hash)
+        # Still unhashed, so the next incremental run picks it up again
+        self.assertEqual(tofu.category_hash, '')
+
+
+class ImportRecipesTests(TempDirMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tempdir = self.make_tempdir()
+
+    def write(self, name, text):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_durations(self):
+        self.assertEqual(parse_duration_value('PT1H25M'), timedelta(hours=1, minutes=25))
+        self.assertEqual(parse_duration_value('PT26H'), timedelta(hours=26))
+        self.assertEqual(parse_duration_value('45'), timedelta(minutes=45))
+        self.assertEqual(parse_duration_value('00:10:00'), timedelta(minutes=10))
+
+    def test_csv_import_sets_derived_data_and_dedupes(self):
+        Recipe.objects.create(recipe_name='Existing Soup')
+        get_diet_facets()
+        path = self.write('recipes.csv', (
+            'ID,recipe_name,cook_time,ingredients,calories,protein,instructions,image\n'
+            '1,Chicken And Dumplings,PT43M,"c(""chicken"", ""carrot"")",400,40,"c(""Simmer."", ""Serve."")",slug-1\n'
+            '2,Existing Soup,PT5M,"c(""water"")",NA,NA,,slug-2\n'
+            '3,Chicken And Dumplings,PT1M,,,,,\n'
+            '4,,PT1M,,,,,\n'
+        ))
+        out = io.StringIO()
+        call_command('import_recipes', path, '--batch-size', '2', stdout=out)
+        self.assertIn('Imported 1 recipes (2 duplicates skipped, 1 invalid rows)', out.getvalue())
+
+        recipe = Recipe.objects.get(recipe_name='Chicken And Dumplings')
+        self.assertEqual(recipe.cook_time, timedelta(minutes=43))
+        self.assertEqual(recipe.ingredients_list, ['Chicken', 'Carrot'])
+        self.assertEqual(recipe.instructions_list, ['Simmer.', 'Serve.'])
+        self.assertAlmostEqual(recipe.protein_per_calorie, 0.1)
+        self.assertFalse(recipe.image)
+        self.assertEqual(list(search_recipes(Recipe.objects.all(), 'dumplings')), [recipe])
+        self.assertEqual(list(recipes_with_ingredients(['carrot'])), [recipe])
+        self.assertEqual(get_diet_facets()[1], 2)
+
+    def test_jsonl_import(self):
+        path = self.write('recipes.jsonl', '\n'.join([
+            json.dumps({'recipe_name': 'Tofu Bowl', 'ingredients': ['tofu', 'rice'], 'instructions': ['Cook "rice".'],
+                        'diet_types': ['Vegan', 'Keto'], 'total_time': 'PT20M'}),
+            'not json',
+            '',
+        ]))
+        out = io.StringIO()
+        call_command('import_recipes', path, stdout=out)
+        self.assertIn('Imported 1 recipes (0 duplicates skipped, 1 invalid rows)', out.getvalue())
+        recipe = Recipe.objects.get(recipe_name='Tofu Bowl')
+        self.assertEqual(recipe.instructions_list, ['Cook "rice".'])
+        self.assertEqual(recipe.diet_mask, diet_bit('Vegan') | diet_bit('Keto'))
+        self.assertEqual(recipe.total_time, timedelta(minutes=20))
+
+
+class SimilarRecipeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        curry = dict(calories=400, protein=18, carbohydrate=50, fat=12, type='dinner', cuisine='Indian')
+        self.lentil = Recipe.objects.create(recipe_name='Lentil Curry', ingredients='"lentils", "onion", "curry powder"', **curry)
+        self.chickpea = Recipe.objects.create(recipe_name='Chickpea Curry', ingredients='"chickpeas", "onion", "curry powder"', **curry)
+        self.cake = Recipe.objects.create(
+            recipe_name='Chocolate Cake', ingredients='"flour", "sugar", "cocoa"',
+            calories=900, protein=6, carbohydrate=120, fat=45, type='dessert', cuisine='French',
+        )
+
+    def test_blocked_search_matches_full_product(self):
+        features = np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32)
+        full = features @ features.T
+        np.fill_diagonal(full, -np.inf)
+        expected = np.argsort(-full, axis=1, kind='stable')[:, :3]
+        for row, neighbours, scores in nearest_neighbors(features, k=3, block_size=7):
+            self.assertEqual(list(neighbours), list(expected[row]))
+            self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_features_are_unit_length(self):
+        ids, features = build_features()
+        self.assertEqual(list(ids), [self.lentil.pk, self.chickpea.pk, self.cake.pk])
+        np.testing.assert_allclose(np.linalg.norm(features, axis=1), 1, rtol=1e-5)
+
+    def test_detail_page_reads_neighbours_in_one_query(self):
+        # The cake is unlike both curries (negative cosine), so it is nobody's neighbour
+        self.assertEqual(build_similar_recipes(k=2), 2)
+        self.assertEqual(similar_recipes(self.cake.pk), [])
+        with self.assertNumQueries(1):
+            neighbours = similar_recipes(self.lentil.pk)
+            self.assertEqual([recipe.recipe_name for recipe in neighbours], ['Chickpea Curry'])
+
+        response = self.client.get(reverse('recipe_detail', args=[self.lentil.pk]))
+        self.assertContains(response, 'Similar Recipes')
+        self.assertContains(response, reverse('recipe_detail', args=[self.chickpea.pk]))
+
+        self.chickpea.delete()
+        self.assertEqual(similar_recipes(self.lentil.pk), [])
+
+    def test_detail_etag_follows_rebuilds_and_neighbours(self):
+        url = reverse('recipe_detail', args=[self.lentil.pk])
+        before = self.client.get(url)['ETag']
+        build_similar_recipes(k=2)
+        built = self.client.get(url)
+        self.assertNotEqual(built['ETag'], before)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=built['ETag']).status_code, 304)
+
+        # A rebuild written by another process reaches this one through the rows
+        SimilarRecipe.objects.update(built_at=timezone.now())
+        rebuilt = self.client.get(url, HTTP_IF_NONE_MATCH=built['ETag'])
+        self.assertEqual(rebuilt.status_code, 200)
+
+        Recipe.objects.filter(pk=self.chickpea.pk).update(recipe_name='Spiced Chickpea Curry', updated_at=timezone.now())
+        renamed = self.client.get(url, HTTP_IF_NONE_MATCH=rebuilt['ETag'])
+        self.assertContains(renamed, 'Spiced Chickpea Curry')
+
+
+class CountingEmbeddings(Embeddings):
+    """Stand-in embedder that records every text it is asked to embed"""
+
+    def __init__(self):
+        self.seen = []
+
+    def embed_documents(self, texts):
+        self.seen.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+class EmbeddingCacheTests(TempDirMixin, TestCase):
+    def setUp(self):
+        self.path = os.path.join(self.make_tempdir(), 'embeddings.sqlite3')
+        self.embedder = CountingEmbeddings()
+
+    def cached(self, model='model-a'):
+        cache_ = EmbeddingCache(self.path)
+        self.addCleanup(cache_.connection.close)
+        return CachedEmbeddings(self.embedder, model, cache_, batch_size=2)
+
+    def test_rebuild_only_embeds_changed_documents(self):
+        first = self.cached().embed_documents(['lentil curry', 'chickpea curry', 'cake'])
+        self.assertEqual(len(self.embedder.seen), 3)
+
+        self.embedder.seen.clear()
+        embeddings = self.cached()
+        second = embeddings.embed_documents(['lentil curry', 'chickpea stew', 'cake'])
+        self.assertEqual(self.embedder.seen, ['chickpea stew'])
+        self.assertEqual((embeddings.hits, embeddings.misses), (2, 1))
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[1], [13.0, 1.0])
+        self.assertEqual(len(embeddings.cache), 4)
+
+    def test_model_is_part_of_the_key(self):
+        self.cached('model-a').embed_documents(['lentil curry'])
+        self.cached('model-b').embed_documents(['lentil curry'])
+        self.assertEqual(self.embedder.seen, ['lentil curry', 'lentil curry'])
+
+
+class IndexUpdaterTests(TempDirMixin, TestCase):
+    def setUp(self):
+        self.lentil = Recipe.objects.create(recipe_name='Lentil Curry', calories=400)
+        self.cake = Recipe.objects.create(recipe_name='Chocolate Cake', calories=900)
+        self.path = os.path.join(self.make_tempdir(), 'faiss_index.index')
+        self.embedder = CountingEmbeddings()
+        self.vectorstore = build_vectorstore(self.embedder)
+        self.updater = IndexUpdater()
+        self.updater.attach(self.vectorstore, self.path, start=False)
+        patcher = mock.patch('recipes.signals.updater', self.updater)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def documents(self):
+        store = self.vectorstore
+        return {doc_id: store.docstore.search(doc_id).page_content.splitlines()[0] for doc_id in store.index_to_docstore_id.values()}
+
+    def test_saves_and_deletes_are_applied_in_one_batch(self):
+        self.assertEqual(self.updater.pending, {})
+        self.embedder.seen.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            soup = Recipe.objects.create(recipe_name='Lentil Soup', calories=300)
+            self.lentil.recipe_name = 'Red Lentil Curry'
+            self.lentil.save()
+            self.cake.delete()
+        self.assertEqual(self.updater.flush(), 3)
+        self.assertEqual(len(self.embedder.seen), 2)
+        self.assertEqual(self.documents(), {
+            str(self.lentil.pk): 'Recipe: Red Lentil Curry',
+            str(soup.pk): 'Recipe: Lentil Soup',
+        })
+
+        self.assertTrue(self.updater.persist())
+        self.assertFalse(self.updater.persist())
+        saved = load_vectorstore(self.path, self.embedder)
+        self.assertEqual(sorted(saved.index_to_docstore_id.values()), sorted(self.documents()))
+
+    def test_reconcile_picks_up_bulk_writes(self):
+        Recipe.objects.filter(pk=self.cake.pk).update(recipe_name='Carrot Cake', updated_at=timezone.now())
+        Recipe.objects.filter(pk=self.lentil.pk).delete()  # in another process: no on_commit here
+        self.updater.reconcile()
+        self.assertEqual(self.updater.pending, {str(self.cake.pk): True, str(self.lentil.pk): False})
+        self.updater.flush()
+        self.assertEqual(self.documents(), {str(self.cake.pk): 'Recipe: Carrot Cake'})
+
+
+class LocalEmbeddingTests(TestCase):
+    def test_vectors_are_stable_and_unit_length(self):
+        texts = ['Recipe: Lentil Curry', 'Recipe: Chocolate Cake', '']
+        vectors = np.array(HashingEmbeddings(64).embed_documents(texts))
+        self.assertEqual(vectors.shape, (3, 64))
+        np.testing.assert_allclose(np.linalg.norm(vectors[:2], axis=1), 1, rtol=1e-5)
+        self.assertFalse(vectors[2].any())
+        np.testing.assert_allclose(HashingEmbeddings(64, batch_size=1).embed_documents(texts), vectors)
+
+    @override_settings(EMBEDDING_BACKEND='local')
+    def test_index_builds_and_answers_offline(self):
+        embeddings = get_embeddings()
+        self.assertIsInstance(embeddings, HashingEmbeddings)
+        Recipe.objects.create(recipe_name='Lentil Curry', cuisine='Indian', ingredients='"lentils", "onion"')
+        Recipe.objects.create(recipe_name='Chocolate Cake', cuisine='French', ingredients='"flour", "cocoa"')
+        results = build_vectorstore(embeddings).similarity_search('a curry with lentils', k=1)
+        self.assertTrue(results[0].page_content.startswith('Recipe: Lentil Curry'))
+
+    @override_settings(EMBEDDING_BACKEND='openai')
+    def test_unknown_backend_is_a_configuration_error(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_embeddings()
+
+
+class MappedIndexTests(TempDirMixin, TestCase):
+    def setUp(self):
+        for name in ('Lentil Curry', 'Chickpea Curry', 'Chocolate Cake', 'Carrot Cake'):
+            Recipe.objects.create(recipe_name=name, ingredients='"onion"' if 'Curry' in name else '"flour"')
+        self.path = os.path.join(self.make_tempdir(), 'faiss_index.index')
+        self.embeddings = HashingEmbeddings(64)
+        self.built = build_vectorstore(self.embeddings)
+        save_vectorstore(self.built, self.path)
+
+    def test_loaded_index_answers_like_the_built_one_without_the_database(self):
+        with self.assertNumQueries(0):
+            loaded = load_vectorstore(self.path, self.embeddings)
+            results = loaded.similarity_search_with_score('chocolate cake with flour', k=3)
+        self.assertIsInstance(loaded.docstore, DocumentFile)
+        self.assertNotIn('index.pkl', os.listdir(self.path))
+        expected = self.built.similarity_search_with_score('chocolate cake with flour', k=3)
+        self.assertEqual([doc.id for doc, _ in results], [doc.id for doc, _ in expected])
+        self.assertEqual([doc.page_content for doc, _ in results], [doc.page_content for doc, _ in expected])
+        np.testing.assert_allclose([score for _, score in results], [score for _, score in expected], rtol=1e-5)
+
+    def test_saves_swap_whole_versions(self):
+        first = current_version(self.path)
+        reader = load_vectorstore(self.path, self.embeddings)
+        Recipe.objects.filter(recipe_name='Carrot Cake').delete()
+        second = save_vectorstore(build_vectorstore(self.embeddings), self.path)
+        third = save_vectorstore(build_vectorstore(self.embeddings), self.path)
+        self.assertEqual(current_version(self.path), third)
+        self.assertEqual(sorted(name for name in os.listdir(self.path) if name.startswith('v')), [second, third])
+        self.assertGreater(second, first)
+
+        # A reader of a pruned version still sees its own index and documents together
+        results = reader.similarity_search('carrot cake', k=4)
+        self.assertEqual(len(results), 4)
+        self.assertIn('Recipe: Carrot Cake', [doc.page_content.splitlines()[0] for doc in results])
+        self.assertEqual(load_vectorstore(self.path, self.embeddings).index.ntotal, 3)
+
+    def test_shared_index_reopens_new_versions(self):
+        shared = SharedIndex(self.path, self.embeddings)
+        first = shared.get()
+        self.assertIs(shared.get(), first)
+        Recipe.objects.create(recipe_name='Lentil Soup')
+        with override_settings(FAISS_INDEX_PATH=self.path, EMBEDDING_BACKEND='local', LOCAL_EMBEDDING_DIMENSIONS=64):
+            out = io.StringIO()
+            call_command('update_faiss_index', stdout=out)
+        self.assertIn('Updated 1 documents', out.getvalue())
+        self.assertEqual(shared.get().index.ntotal, 5)
+        self.assertEqual(first.index.ntotal, 4)
+
+    def test_live_update_copies_the_mapped_index(self):
+        shared = load_vectorstore(self.path, self.embeddings)
+        updater = IndexUpdater()
+        updater.attach(load_vectorstore(self.path, self.embeddings), self.path, start=False)
+        self.assertIsInstance(shared.docstore, DocumentFile)
+        self.assertNotIsInstance(updater.vectorstore.docstore, DocumentFile)
+        soup = Recipe.objects.create(recipe_name='Lentil Soup')
+        updater.enqueue(upserts=[soup.pk])
+        updater.flush()
+        self.assertTrue(updater.persist())
+
+        # A process still holding the old files keeps answering from them
+        self.assertEqual(len(shared.index_to_docstore_id), 4)
+        self.assertEqual(len(shared.similarity_search('lentil', k=4)), 4)
+        reloaded = load_vectorstore(self.path, self.embeddings)
+        self.assertEqual(reloaded.index.ntotal, 5)
+        self.assertEqual(reloaded.similarity_search('lentil soup', k=1)[0].id, str(soup.pk))
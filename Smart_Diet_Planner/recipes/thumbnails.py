@@ -0,0 +1,197 @@
+import base64
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageFilter
+
+from .models import Recipe
+
+# Widths generated below the source width; the source width itself is
+# also re-encoded as WebP. JPEG at the source width is the original file.
+THUMBNAIL_WIDTHS = (160, 320, 480, 800)
+THUMBNAIL_DIR = 'thumbs'
+# Bumped when variant file names change; older variants count as stale
+THUMBNAIL_VERSION = 2
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# Low-quality placeholder: a tiny blurred WebP inlined as a data URI
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_QUALITY = 30
+
+
+def thumbnail_name(source_name, width, ext):
+    """Storage name of a variant: recipes/foo.jpg -> recipes/thumbs/foo.jpg-320w.webp
+
+    The source extension is kept so foo.jpg and foo.png never share files.
+    """
+    directory, filename = os.path.split(source_name)
+    return os.path.join(directory, THUMBNAIL_DIR, f'{filename}-{width}w.{ext}')
+
+
+def _legacy_thumbnail_name(source_name, width, ext):
+    """Variant name before THUMBNAIL_VERSION 2, without the source extension"""
+    directory, filename = os.path.split(source_name)
+    return os.path.join(directory, THUMBNAIL_DIR, f'{os.path.splitext(filename)[0]}-{width}w.{ext}')
+
+
+def thumbnails_stale(recipe):
+    """True when the recipe's stored variants were not made from its current image"""
+    source = recipe.image.name if recipe.image else ''
+    variants = recipe.image_variants or {}
+    if source and (not recipe.image_placeholder or variants.get('version') != THUMBNAIL_VERSION):
+        return True
+    return variants.get('source', '') != source
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def make_placeholder(image):
+    """A ~200 byte blurred data URI previewing ``image`` while the real file loads"""
+    width, height = image.size
+    small = image.resize((PLACEHOLDER_WIDTH, max(1, round(height * PLACEHOLDER_WIDTH / width))), Image.BILINEAR)
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    data = _encode(small, 'WEBP', quality=PLACEHOLDER_QUALITY).read()
+    return 'data:image/webp;base64,' + base64.b64encode(data).decode()
+
+
+def _replace(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, content)
+
+
+def generate_thumbnails(recipe):
+    """Write resized WebP/JPEG variants of recipe.image.
+
+    Returns the (image_variants, image_placeholder) values to store.
+    """
+    if not recipe.image:
+        return {}, ''
+    storage = recipe.image.storage
+    source = recipe.image.name
+    with storage.open(source, 'rb') as f:
+        original = Image.open(f)
+        original.load()
+    original = original.convert('RGB')
+    source_width, source_height = original.size
+
+    widths = [width for width in THUMBNAIL_WIDTHS if width < source_width]
+    for width in widths + [source_width]:
+        height = max(1, round(source_height * width / source_width))
+        resized = original if width == source_width else original.resize((width, height), Image.LANCZOS)
+        _replace(storage, thumbnail_name(source, width, 'webp'), _encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4))
+        if width != source_width:
+            _replace(storage, thumbnail_name(source, width, 'jpg'), _encode(resized, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True))
+
+    variants = {'source': source, 'width': source_width, 'widths': widths, 'version': THUMBNAIL_VERSION}
+    return variants, make_placeholder(original)
+
+
+def variant_names(variants):
+    """Storage names of every file generate_thumbnails() wrote for ``variants``"""
+    if not variants.get('source'):
+        return []
+    source = variants['source']
+    name = thumbnail_name if variants.get('version') == THUMBNAIL_VERSION else _legacy_thumbnail_name
+    names = [name(source, width, 'webp') for width in variants['widths'] + [variants['width']]]
+    names += [name(source, width, 'jpg') for width in variants['widths']]
+    return names
+
+
+def delete_thumbnails(storage, variants, keep=()):
+    """Remove the variant files of an image the recipe no longer uses, except the names in ``keep``"""
+    for name in set(variant_names(variants)) - set(keep):
+        if storage.exists(name):
+            storage.delete(name)
+
+
+def refresh_thumbnails(recipe):
+    """Regenerate variants and placeholder and store them without re-running Recipe.save()"""
+    previous = recipe.image_variants or {}
+    try:
+        variants, placeholder = generate_thumbnails(recipe)
+    except (OSError, ValueError):
+        variants, placeholder = {}, ''  # missing or unreadable file: fall back to the original
+    # Only files the new variants did not just write again
+    delete_thumbnails(recipe.image.storage, previous, keep=variant_names(variants))
+    recipe.image_variants = variants
+    recipe.image_placeholder = placeholder
+    type(recipe).objects.filter(pk=recipe.pk).update(
+        image_variants=variants, image_placeholder=placeholder, updated_at=timezone.now()
+    )
+    return variants
+
+
+# One thread encodes every recipe's variants, in the order they were saved
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _submit(job, *args):
+    global _executor
+    if not settings.THUMBNAILS_IN_BACKGROUND:
+        job(*args)
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+    _executor.submit(_run, job, *args)
+
+
+def _run(job, *args):
+    try:
+        job(*args)
+    except Exception as e:
+        print(f"Error updating recipe thumbnails: {e}")
+    finally:
+        close_old_connections()
+
+
+def _refresh_recipe(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image', 'image_variants', 'image_placeholder').first()
+    if recipe is not None and thumbnails_stale(recipe):
+        refresh_thumbnails(recipe)
+
+
+def schedule_thumbnails(recipe):
+    """Refresh a saved recipe's variants off the request path once its transaction commits.
+
+    Jobs lost to a restart leave the recipe stale, which the
+    generate_thumbnails command picks up.
+    """
+    recipe_id = recipe.pk
+    transaction.on_commit(lambda: _submit(_refresh_recipe, recipe_id))
+
+
+def schedule_thumbnail_cleanup(recipe):
+    """Remove a deleted recipe's variant files once the delete commits"""
+    storage, variants = recipe.image.storage, recipe.image_variants or {}
+    if variants.get('source'):
+        transaction.on_commit(lambda: _submit(delete_thumbnails, storage, variants))
+
+
+def srcset(recipe, fmt='webp'):
+    """srcset value for a recipe image in 'webp' or 'jpeg', '' when no variants exist"""
+    variants = recipe.image_variants or {}
+    if not recipe.image or variants.get('source') != recipe.image.name or variants.get('version') != THUMBNAIL_VERSION:
+        return ''
+    storage = recipe.image.storage
+    source = variants['source']
+    ext = 'webp' if fmt == 'webp' else 'jpg'
+    candidates = [f'{storage.url(thumbnail_name(source, width, ext))} {width}w' for width in variants['widths']]
+    if fmt == 'webp':
+        candidates.append(f"{storage.url(thumbnail_name(source, variants['width'], 'webp'))} {variants['width']}w")
+    else:
+        candidates.append(f"{recipe.image.url} {variants['width']}w")
+    return ', '.join(candidates)
@@ -4,5 +4,9 @@ from . import views
 urlpatterns = [
     path('detail/<int:pk>/', views.recipe_view, name='recipe_detail'),
     path('by-diet/', views.recipes_by_diet, name='recipes_by_diet'),
+    path('page/', views.recipes_page, name='recipes_page'),
+    path('ingredients/', views.recipes_by_ingredient, name='recipes_by_ingredient'),
+    path('pantry/', views.pantry_matches, name='pantry_matches'),
+    path('autocomplete/', views.recipe_autocomplete, name='recipe_autocomplete'),
     path('', views.recipes_by_diet, name='recipes_home'),
 ]
\ No newline at end of file
@@ -1,12 +1,12 @@
-from rest_framework import serializers
 from .models import Recipe
 
-class RecipeSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Recipe 
-        fields = '__all__'
+# Columns the RAG documents are built from
+RECIPE_DATA_FIELDS = (
+    'id', 'recipe_name', 'cuisine', 'type', 'ingredients', 'instructions',
+    'calories', 'fat', 'saturated_fat', 'cholesterol', 'sodium',
+    'carbohydrate', 'fiber', 'sugar', 'protein',
+)
 
-def get_recipes_data():
-    recipes = Recipe.objects.all()
-    serializer = RecipeSerializer(recipes, many=True)
-    return serializer.data 
\ No newline at end of file
+def get_recipes_data(fields=RECIPE_DATA_FIELDS):
+    """Recipe rows as plain dicts, read with .values() instead of a serializer"""
+    return list(Recipe.objects.order_by('id').values(*fields))
@@ -0,0 +1,184 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from langchain_community.vectorstores import FAISS
+
+from .embeddings import recipe_document
+from .index_store import document_versions, make_writable, save_vectorstore
+from .models import Recipe
+from .utils import RECIPE_DATA_FIELDS, get_recipes_data
+
+# Document columns plus the row version each document was built from
+DOCUMENT_FIELDS = RECIPE_DATA_FIELDS + ('updated_at',)
+# Recipes read and embedded per step while applying changes
+UPDATE_BATCH_SIZE = 500
+
+
+def document_id(recipe_id):
+    """Docstore id of a recipe's document, the same across rebuilds"""
+    return str(recipe_id)
+
+
+def recipe_documents(rows):
+    """(texts, metadatas, ids) for get_recipes_data(DOCUMENT_FIELDS) rows"""
+    texts, metadatas, ids = [], [], []
+    for row in rows:
+        texts.append(recipe_document(row))
+        metadatas.append({'recipe_id': row['id'], 'updated_at': row['updated_at'].isoformat()})
+        ids.append(document_id(row['id']))
+    return texts, metadatas, ids
+
+
+def build_vectorstore(embeddings):
+    """A FAISS store with one document per recipe, keyed by document_id()"""
+    texts, metadatas, ids = recipe_documents(get_recipes_data(DOCUMENT_FIELDS))
+    return FAISS.from_texts(texts, embeddings, metadatas=metadatas, ids=ids)
+
+
+class IndexUpdater:
+    """Keep a FAISS store in step with the Recipe table and save it for the readers.
+
+    Only one process should run this, the writer: `manage.py
+    update_faiss_index --watch`, or a single-process server with
+    settings.FAISS_INDEX_WRITER. Other processes never change their store;
+    they reopen each version the writer saves (see index_store.SharedIndex).
+
+    Saves and deletes made in the writer queue the document id; a background
+    thread applies the queue in batches (a burst of saves becomes one
+    embedding call) and saves a new version every ``persist_interval``
+    seconds when something changed. At the same interval the store is
+    reconciled against each row's updated_at, which picks up bulk writes
+    and changes made by other processes.
+    """
+
+    def __init__(self, flush_delay=2.0, persist_interval=60.0):
+        self.flush_delay = flush_delay
+        self.persist_interval = persist_interval
+        self.vectorstore = None
+        self.path = None
+        self.pending = {}  # document id -> True to upsert, False to delete
+        self._pending_lock = threading.Lock()
+        # Serializes changes to the store between the thread and atexit
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._dirty = False
+        self._reconcile_due = False
+        self._last_persist = time.monotonic()
+
+    def attach(self, vectorstore, path, start=True):
+        """Track ``vectorstore`` (saved at ``path``) and queue whatever it is missing.
+
+        With ``start`` the first reconcile runs on the background thread, so
+        attaching does not slow down the first request.
+        """
+        with self._lock:
+            # The writer's own copy in memory; readers keep the mapped files
+            make_writable(vectorstore)
+            self.vectorstore = vectorstore
+            self.path = path
+        if start:
+            self._reconcile_due = True
+            self.start()
+            self._wake.set()
+        else:
+            self.reconcile()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='faiss-index-updater', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def enqueue(self, upserts=(), deletes=()):
+        """Queue recipe ids to re-embed or drop; a no-op outside the writer"""
+        if self.vectorstore is None:
+            return
+        with self._pending_lock:
+            self.pending.update((document_id(pk), True) for pk in upserts)
+            self.pending.update((document_id(pk), False) for pk in deletes)
+        self._wake.set()
+
+    def reconcile(self):
+        """Queue recipes whose document is missing or older than the row, and documents without a recipe"""
+        with self._lock:
+            indexed = document_versions(self.vectorstore)
+        current = {
+            document_id(pk): updated_at.isoformat()
+            for pk, updated_at in Recipe.objects.values_list('id', 'updated_at').iterator()
+        }
+        with self._pending_lock:
+            self.pending.update((doc_id, True) for doc_id, stamp in current.items() if indexed.get(doc_id) != stamp)
+            self.pending.update((doc_id, False) for doc_id in indexed.keys() - current.keys())
+        return len(self.pending)
+
+    def flush(self):
+        """Apply the queued changes now, returns the number of documents touched"""
+        with self._pending_lock:
+            pending, self.pending = self.pending, {}
+        if not pending or self.vectorstore is None:
+            return 0
+        doc_ids = list(pending)
+        for start in range(0, len(doc_ids), UPDATE_BATCH_SIZE):
+            self._apply(doc_ids[start:start + UPDATE_BATCH_SIZE], pending)
+        return len(doc_ids)
+
+    def _apply(self, doc_ids, pending):
+        upserts = [int(doc_id) for doc_id in doc_ids if pending[doc_id]]
+        rows = Recipe.objects.filter(pk__in=upserts).order_by('id').values(*DOCUMENT_FIELDS)
+        texts, metadatas, ids = recipe_documents(rows)
+        vectors = self.vectorstore.embeddings.embed_documents(texts) if texts else []
+        with self._lock:
+            present = set(self.vectorstore.index_to_docstore_id.values())
+            stale = [doc_id for doc_id in doc_ids if doc_id in present]
+            if stale:
+                self.vectorstore.delete(stale)
+            if texts:
+                self.vectorstore.add_embeddings(zip(texts, vectors), metadatas, ids)
+            self._dirty = self._dirty or bool(stale or texts)
+
+    def persist(self):
+        """Save a new version if the store changed since the last save"""
+        with self._lock:
+            self._last_persist = time.monotonic()
+            if not self._dirty or self.path is None:
+                return False
+            save_vectorstore(self.vectorstore, self.path)
+            self._dirty = False
+        return True
+
+    def sync(self):
+        """Reconcile, apply and save in one go, returns the number of documents touched"""
+        self.reconcile()
+        touched = self.flush()
+        self.persist()
+        return touched
+
+    def close(self):
+        try:
+            self.flush()
+            self.persist()
+        except Exception as e:
+            print(f"Error saving FAISS index: {e}")
+
+    def _run(self):
+        while True:
+            if self._wake.wait(self.persist_interval):
+                time.sleep(self.flush_delay)  # let a burst of saves land in one batch
+            self._wake.clear()
+            try:
+                if self._reconcile_due or time.monotonic() - self._last_persist >= self.persist_interval:
+                    self._reconcile_due = False
+                    self.sync()
+                else:
+                    self.flush()
+            except Exception as e:
+                print(f"Error updating FAISS index: {e}")
+            finally:
+                close_old_connections()
+
+
+updater = IndexUpdater(settings.FAISS_FLUSH_DELAY, settings.FAISS_PERSIST_INTERVAL)
@@ -1,44 +1,141 @@
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.views.decorators.http import condition
 from .models import Recipe
+from .api import APIQueryError, api_ordering, clean_row, export_lines, filter_recipes, parse_fields
+from .autocomplete import suggest
+from .browse import get_browse_page
+from .conditional import listing_etag, recipe_etag
+from .ingredients import parse_ingredient_query, recipes_with_ingredients
+from .nutrition import apply_sort
+from .pagination import keyset_page
+from .pantry import match_pantry
+from .similar import similar_recipes
 
+@condition(etag_func=recipe_etag)
 def recipe_view(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk)
-    return render(request, 'recipes/recipe_details.html', {'recipe': recipe})
+    return render(request, 'recipes/recipe_details.html', {
+        'recipe': recipe,
+        'similar_recipes': similar_recipes(pk),
+    })
 
+@condition(etag_func=listing_etag)
 def recipes_by_diet(request):
     """View to display recipes filtered by diet type"""
-    diet_type = request.GET.get('diet', 'All')
-    search_query = request.GET.get('search', '')
-    
-    # Get all available diet types
-    diet_types = Recipe.get_available_diet_types()
-    
-    # Filter recipes
-    recipes = Recipe.objects.all()
-    
-    if diet_type != 'All':
-        recipes = recipes.filter(diet_types__icontains=diet_type)
-    
-    if search_query:
-        recipes = recipes.filter(
-            Q(recipe_name__icontains=search_query) |
-            Q(ingredients__icontains=search_query) |
-            Q(type__icontains=search_query)
-        )
-    
-    # Get recipe counts by diet type
-    diet_counts = {}
-    for dt in diet_types:
-        diet_counts[dt] = Recipe.objects.filter(diet_types__icontains=dt).count()
-    
-    context = {
-        'recipes': recipes.order_by('recipe_name'),
-        'diet_types': diet_types,
-        'selected_diet': diet_type,
-        'search_query': search_query,
-        'diet_counts': diet_counts,
-        'total_recipes': Recipe.objects.count()
-    }
-    
+    context = get_browse_page(request)
     return render(request, 'recipes/recipes_by_diet.html', context)
+
+@condition(etag_func=listing_etag)
+def recipes_page(request):
+    """JSON endpoint returning the next page of recipe cards for infinite scroll"""
+    context = get_browse_page(request)
+    html = render_to_string('recipes/recipe_cards.html', {'recipes': context['recipes']}, request=request)
+    return JsonResponse({
+        'html': html,
+        'count': len(context['recipes']),
+        'next_cursor': context['next_cursor'],
+        'has_next': context['has_next'],
+    })
+
+def recipes_by_ingredient(request):
+    """JSON lookup such as ?q=chicken AND spinach, NOT dairy (or ?include=...&exclude=...)"""
+    include, exclude = parse_ingredient_query(request.GET.get('q', ''))
+    for term in request.GET.getlist('include'):
+        include.extend(parse_ingredient_query(term)[0])
+    for term in request.GET.getlist('exclude'):
+        # Already an exclusion, so a NOT/- prefix on the term changes nothing
+        include_terms, exclude_terms = parse_ingredient_query(term)
+        exclude.extend(include_terms + exclude_terms)
+
+    if not include and not exclude:
+        return JsonResponse({'error': 'Provide ingredients with q=, include= or exclude='}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 50)), 1), 200)
+    except ValueError:
+        limit = 50
+
+    recipes = recipes_with_ingredients(include, exclude).order_by('recipe_name', 'id')
+    results = [
+        {'id': recipe['id'], 'recipe_name': recipe['recipe_name'], 'url': reverse('recipe_detail', args=[recipe['id']])}
+        for recipe in recipes.values('id', 'recipe_name')[:limit]
+    ]
+    return JsonResponse({
+        'include': include,
+        'exclude': exclude,
+        'count': len(results),
+        'results': results,
+    })
+
+def pantry_matches(request):
+    """JSON "what can I cook" lookup such as ?have=chicken, rice, spinach&max_missing=2"""
+    terms = []
+    for value in request.GET.getlist('have'):
+        terms.extend(parse_ingredient_query(value)[0])
+    if not terms:
+        return JsonResponse({'error': 'Provide the ingredients you have with have='}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 200)
+    except ValueError:
+        limit = 20
+    try:
+        max_missing = int(request.GET['max_missing'])
+    except (KeyError, ValueError):
+        max_missing = None
+    include_staples = request.GET.get('staples', '1') != '0'
+
+    results = match_pantry(terms, limit, include_staples, max_missing)
+    for result in results:
+        result['url'] = reverse('recipe_detail', args=[result['id']])
+    return JsonResponse({
+        'have': terms,
+        'count': len(results),
+        'results': results,
+    })
+
+def recipes_api(request):
+    """Read-only recipe catalog: ?fields=, ?diet=, ?min_<nutrient>=/?max_<nutrient>=, ?sort=, ?cursor=.
+
+    ?format=ndjson streams every matching row instead of one page.
+    """
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        recipes = filter_recipes(request.GET)
+        ordering = api_ordering(request.GET.get('sort'))
+    except APIQueryError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.GET.get('format') == 'ndjson':
+        return StreamingHttpResponse(export_lines(recipes, fields), content_type='application/x-ndjson')
+
+    try:
+        limit = min(max(int(request.GET.get('limit', 100)), 1), 500)
+    except ValueError:
+        limit = 100
+
+    # The cursor needs the sort columns even when they were not asked for
+    sort_columns = [name.lstrip('-') for name in ordering if name.lstrip('-') not in fields]
+    recipes = apply_sort(recipes, ordering).values(*fields, *sort_columns)
+    page = keyset_page(recipes, ordering, request.GET.get('cursor'), limit)
+    for row in page.items:
+        for name in sort_columns:
+            del row[name]
+    return JsonResponse({
+        'results': [clean_row(row) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next,
+    }, encoder=DjangoJSONEncoder)
+
+def recipe_autocomplete(request):
+    """Typeahead suggestions such as ?q=chick (add nutrition=1 for loggable recipes only)"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    suggestions = suggest(request.GET.get('q', ''), limit, request.GET.get('nutrition') == '1')
+    return JsonResponse(suggestions)
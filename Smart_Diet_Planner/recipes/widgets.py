@@ -0,0 +1,31 @@
+from django import forms
+from django.urls import reverse
+
+from .models import Recipe
+
+
+class RecipeAutocompleteWidget(forms.HiddenInput):
+    """Search box with typeahead suggestions that fills a hidden recipe id.
+
+    Replaces a <select> listing every recipe; only the selected recipe is
+    read from the database when the form is rendered.
+    """
+    template_name = 'recipes/widgets/recipe_autocomplete.html'
+
+    class Media:
+        js = ['recipes/js/recipe_autocomplete.js']
+
+    def __init__(self, attrs=None, nutrition_only=False):
+        super().__init__(attrs)
+        self.nutrition_only = nutrition_only
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        url = reverse('recipe_autocomplete')
+        context['widget']['url'] = f'{url}?nutrition=1' if self.nutrition_only else url
+        context['widget']['recipe'] = (
+            Recipe.objects.filter(pk=value).only(
+                'id', 'recipe_name', 'calories', 'protein', 'carbohydrate', 'fat'
+            ).first() if value not in (None, '') and str(value).isdigit() else None
+        )
+        return context
@@ -16,11 +16,13 @@ import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", message=".*LangChainDeprecationWarning:.*")
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from django.conf import settings
 from langchain_community.vectorstores import FAISS
+from recipes.embeddings import CachedEmbeddings, get_embeddings
+from recipes.index_store import INDEX_FILE, current_version, load_vectorstore, save_vectorstore
 from recipes.utils import get_recipes_data
+from recipes.vector_index import DOCUMENT_FIELDS, recipe_documents
 from dotenv import load_dotenv
-import shutil
 
 load_dotenv()
 
@@ -29,77 +31,58 @@ def regenerate_faiss_index():
     
     print("🔄 Regenerating FAISS index...")
     
-    # Check if API key is available
+    # Check if API key is available (the local backend does not need one)
     api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    if not api_key and settings.EMBEDDING_BACKEND == 'google':
         print("❌ Error: GOOGLE_API_KEY not found in environment variables")
-        print("💡 Please add your Google API key to the .env file")
+        print("💡 Please add your Google API key to the .env file, or set EMBEDDING_BACKEND=local")
         return False
     
     try:
-        # Remove existing corrupted files
-        vectorstore_path = "faiss_index.index"
+        # Remove stray files; the index folder itself is left to save_vectorstore,
+        # which adds a new version without touching the one running servers read
+        vectorstore_path = settings.FAISS_INDEX_PATH
         pkl_path = "faiss_index.pkl"
         
-        if os.path.exists(vectorstore_path):
-            print(f"🗑️ Removing existing directory: {vectorstore_path}")
-            shutil.rmtree(vectorstore_path)
-            
         if os.path.exists(pkl_path):
             print(f"🗑️ Removing existing file: {pkl_path}")
             os.remove(pkl_path)
         
         # Get recipe data
         print("📚 Loading recipe data...")
-        data = get_recipes_data()
+        data = get_recipes_data(DOCUMENT_FIELDS)
         print(f"✅ Loaded {len(data)} recipes")
         
         # Create documents
         print("📝 Creating documents...")
-        documents = []
-        for recipe in data:
-            text = f"Recipe: {recipe['recipe_name']}\n"
-            text += f"Cuisine: {recipe['cuisine']}\n"
-            text += f"Type: {recipe['type']}\n"
-            text += f"Ingredients: {recipe['ingredients']}\n"
-            text += f"Instructions: {recipe['instructions']}\n"
-            text += f"Nutritional Information:\n"
-            text += f"- Calories: {recipe['calories']}\n"
-            text += f"- Fat: {recipe['fat']}g\n"
-            text += f"- Saturated Fat: {recipe['saturated_fat']}g\n"
-            text += f"- Cholesterol: {recipe['cholesterol']}mg\n"
-            text += f"- Sodium: {recipe['sodium']}mg\n"
-            text += f"- Carbohydrate: {recipe['carbohydrate']}g\n"
-            text += f"- Fiber: {recipe['fiber']}g\n"
-            text += f"- Sugar: {recipe['sugar']}g\n"
-            text += f"- Protein: {recipe['protein']}g\n"
-            documents.append(text)
+        # Documents are keyed by recipe id, so live updates can replace them later
+        documents, metadatas, ids = recipe_documents(data)
         
         print(f"✅ Created {len(documents)} documents")
         
-        # Create embeddings
-        print("🧠 Creating embeddings (this may take a few minutes)...")
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004", 
-            google_api_key=api_key
-        )
+        # Create embeddings, reusing cached vectors for unchanged documents
+        print(f"🧠 Creating embeddings with the {settings.EMBEDDING_BACKEND} backend...")
+        embeddings = get_embeddings(api_key)
         
         # Create and save FAISS vectorstore
         print("💾 Creating FAISS vectorstore...")
-        vectorstore = FAISS.from_texts(documents, embeddings)
+        vectorstore = FAISS.from_texts(documents, embeddings, metadatas=metadatas, ids=ids)
+        if isinstance(embeddings, CachedEmbeddings):
+            print(f"♻️ Reused {embeddings.hits} cached embeddings, embedded {embeddings.misses} new documents")
         
         print("💾 Saving FAISS index...")
-        vectorstore.save_local(vectorstore_path)
+        version = save_vectorstore(vectorstore, vectorstore_path)
+        version_path = os.path.join(vectorstore_path, version)
         
         # Verify the files were created
-        if os.path.exists(vectorstore_path) and os.path.exists(os.path.join(vectorstore_path, "index.faiss")):
+        if current_version(vectorstore_path) == version and os.path.exists(os.path.join(version_path, INDEX_FILE)):
             print("✅ FAISS index created successfully!")
             print(f"📁 Files created:")
-            print(f"   - {vectorstore_path}/")
+            print(f"   - {version_path}/")
             
             # List files in the directory
-            for file in os.listdir(vectorstore_path):
-                file_path = os.path.join(vectorstore_path, file)
+            for file in os.listdir(version_path):
+                file_path = os.path.join(version_path, file)
                 size = os.path.getsize(file_path)
                 print(f"   - {file} ({size} bytes)")
             
@@ -119,17 +102,10 @@ def test_faiss_index():
     
     try:
         api_key = os.getenv("GOOGLE_API_KEY")
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004", 
-            google_api_key=api_key
-        )
+        embeddings = get_embeddings(api_key)
         
-        vectorstore_path = "faiss_index.index"
-        vectorstore = FAISS.load_local(
-            vectorstore_path, 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
+        vectorstore_path = settings.FAISS_INDEX_PATH
+        vectorstore = load_vectorstore(vectorstore_path, embeddings)
         
         # Test search
         results = vectorstore.similarity_search("chicken recipe", k=2)